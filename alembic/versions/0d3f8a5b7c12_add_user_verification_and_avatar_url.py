@@ -0,0 +1,29 @@
+"""Add user is_verified and avatar_url
+
+Revision ID: 0d3f8a5b7c12
+Revises: e1a4b6c9d3f7
+Create Date: 2026-10-16 14:41:05.372950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d3f8a5b7c12'
+down_revision: Union[str, None] = 'e1a4b6c9d3f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Колонки були в моделі User, але раніше створювалися лише через create_all
+    op.add_column('users', sa.Column('is_verified', sa.Boolean(), nullable=True))
+    op.add_column('users', sa.Column('avatar_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'avatar_url')
+    op.drop_column('users', 'is_verified')
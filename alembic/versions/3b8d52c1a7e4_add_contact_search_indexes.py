@@ -0,0 +1,67 @@
+"""Add contact search indexes
+
+Revision ID: 3b8d52c1a7e4
+Revises: f6e29debdf34
+Create Date: 2026-10-16 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8d52c1a7e4'
+down_revision: Union[str, None] = 'f6e29debdf34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || "
+    "coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+)
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+    "first_name, last_name, email, content='contacts', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+    # Індексуємо вже наявні контакти
+    "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name in ('first_name', 'last_name', 'email'):
+            op.create_index(f'ix_contacts_{name}_trgm', 'contacts', [name], unique=False,
+                            postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'})
+        op.create_index('ix_contacts_search_tsv', 'contacts', [sa.text(SEARCH_VECTOR)], unique=False,
+                        postgresql_using='gin')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_contacts_search_tsv', table_name='contacts')
+        for name in ('email', 'last_name', 'first_name'):
+            op.drop_index(f'ix_contacts_{name}_trgm', table_name='contacts')
+    elif dialect == 'sqlite':
+        for trigger in ('contacts_fts_au', 'contacts_fts_ad', 'contacts_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS contacts_fts")
@@ -0,0 +1,83 @@
+"""Add contact phone_e164
+
+Revision ID: 4b9e1f7a2c58
+Revises: a7d2c5e9f1b3
+Create Date: 2026-10-16 17:32:40.115093
+
+"""
+import os
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e1f7a2c58'
+down_revision: Union[str, None] = 'a7d2c5e9f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Копія phones.normalize_phone на момент цієї ревізії: зміни в коді застосунку не повинні
+# змінювати те, як історична міграція заповнює phone_e164
+COUNTRY_CODE = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '380').lstrip('+')
+INTERNATIONAL_PREFIX = os.getenv('PHONE_INTERNATIONAL_PREFIX', '00')
+_EXTENSION_RE = re.compile(r"(?:ext\.?|доб\.?|x|#).*$", re.IGNORECASE)
+_NON_DIGITS_RE = re.compile(r"\D")
+
+
+def normalize_phone(value):
+    if not value:
+        return None
+    value = _EXTENSION_RE.sub("", value).strip()
+    digits = _NON_DIGITS_RE.sub("", value)
+    if not digits:
+        return None
+    if value.startswith("+"):
+        pass
+    elif INTERNATIONAL_PREFIX and digits.startswith(INTERNATIONAL_PREFIX):
+        digits = digits[len(INTERNATIONAL_PREFIX):]
+    elif digits.startswith("0"):
+        digits = COUNTRY_CODE + digits[1:]
+    elif not digits.startswith(COUNTRY_CODE):
+        digits = COUNTRY_CODE + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return "+" + digits
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16), nullable=True))
+
+    # Нормалізація потребує Python, тому заповнюємо пачками за ключем id
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone_number', sa.String),
+                        sa.column('phone_e164', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.phone_number)
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        values = [{'b_id': row.id, 'b_phone': normalize_phone(row.phone_number)} for row in rows]
+        values = [value for value in values if value['b_phone'] is not None]
+        if values:
+            connection.execute(
+                contacts.update().where(contacts.c.id == sa.bindparam('b_id')).values(phone_e164=sa.bindparam('b_phone')),
+                values,
+            )
+
+    op.create_index('ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    op.drop_column('contacts', 'phone_e164')
@@ -0,0 +1,25 @@
+"""Add contacts (user_id, id) index
+
+Revision ID: 5e0a9f3c6b21
+Revises: 9c41e7a2d05b
+Create Date: 2026-10-16 11:48:55.316402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0a9f3c6b21'
+down_revision: Union[str, None] = '9c41e7a2d05b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
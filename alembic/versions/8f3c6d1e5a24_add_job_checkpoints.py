@@ -0,0 +1,36 @@
+"""Add job checkpoints
+
+Revision ID: 8f3c6d1e5a24
+Revises: 4b9e1f7a2c58
+Create Date: 2026-10-16 18:47:21.530662
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3c6d1e5a24'
+down_revision: Union[str, None] = '4b9e1f7a2c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job', sa.String(length=64), nullable=False),
+    sa.Column('run_date', sa.Date(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job', 'run_date', name='uq_job_checkpoints_job_run_date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
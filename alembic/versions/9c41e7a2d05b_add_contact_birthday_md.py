@@ -0,0 +1,41 @@
+"""Add contact birthday month-day key
+
+Revision ID: 9c41e7a2d05b
+Revises: 3b8d52c1a7e4
+Create Date: 2026-10-16 11:03:27.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41e7a2d05b'
+down_revision: Union[str, None] = '3b8d52c1a7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_md', sa.SmallInteger(), nullable=True))
+    # Заповнюємо ключ місяць*100 + день для наявних контактів
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "UPDATE contacts SET birthday_md = "
+            "CAST(strftime('%m', birthday) AS INTEGER) * 100 + CAST(strftime('%d', birthday) AS INTEGER) "
+            "WHERE birthday IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE contacts SET birthday_md = "
+            "EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) "
+            "WHERE birthday IS NOT NULL"
+        )
+    op.create_index('ix_contacts_user_id_birthday_md', 'contacts', ['user_id', 'birthday_md'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_md', table_name='contacts')
+    op.drop_column('contacts', 'birthday_md')
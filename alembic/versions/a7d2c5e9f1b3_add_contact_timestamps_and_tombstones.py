@@ -0,0 +1,48 @@
+"""Add contact timestamps and tombstones
+
+Revision ID: a7d2c5e9f1b3
+Revises: 0d3f8a5b7c12
+Create Date: 2026-10-16 16:05:12.804417
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2c5e9f1b3'
+down_revision: Union[str, None] = '0d3f8a5b7c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Колонки лишаються NULL-допустимими: у SQLite зміна на NOT NULL перебудовує таблицю і видаляє тригери FTS
+    op.add_column('contacts', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('contacts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    # Мітка передається як параметр datetime, а не CURRENT_TIMESTAMP: у SQLite той записує рядок без
+    # мікросекунд, і порівняння з параметрами синхронізації (рядки з .ffffff) пропускало б такі контакти
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    contacts = sa.table('contacts', sa.column('created_at', sa.DateTime()), sa.column('updated_at', sa.DateTime()))
+    op.execute(contacts.update().values(created_at=now, updated_at=now))
+    op.create_index('ix_contacts_user_id_updated_at_id', 'contacts', ['user_id', 'updated_at', 'id'], unique=False)
+
+    # Унікальність email лише серед невидалених контактів
+    op.drop_index('ix_contacts_email', table_name='contacts')
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True,
+                    postgresql_where=sa.text('deleted_at IS NULL'), sqlite_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    # Мітки видалення стають справжнім видаленням, інакше повний унікальний індекс не створиться
+    op.execute("DELETE FROM contacts WHERE deleted_at IS NOT NULL")
+    op.drop_index('ix_contacts_email', table_name='contacts')
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True)
+    op.drop_index('ix_contacts_user_id_updated_at_id', table_name='contacts')
+    op.drop_column('contacts', 'deleted_at')
+    op.drop_column('contacts', 'updated_at')
+    op.drop_column('contacts', 'created_at')
@@ -0,0 +1,26 @@
+"""Add user avatar_hash
+
+Revision ID: c72f1d8e4a90
+Revises: 5e0a9f3c6b21
+Create Date: 2026-10-16 12:37:10.664083
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c72f1d8e4a90'
+down_revision: Union[str, None] = '5e0a9f3c6b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('avatar_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'avatar_hash')
@@ -0,0 +1,26 @@
+"""Add contact version
+
+Revision ID: e1a4b6c9d3f7
+Revises: c72f1d8e4a90
+Create Date: 2026-10-16 13:22:48.190536
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a4b6c9d3f7'
+down_revision: Union[str, None] = 'c72f1d8e4a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('contacts', 'version')
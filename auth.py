@@ -1,7 +1,12 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from dotenv import load_dotenv
+from cache import TTLCache
+import hashlib
+import heapq
+import math
 import os
+import time
 
 # Завантаження змінних середовища
 load_dotenv()
@@ -10,6 +15,50 @@ SECRET_KEY = f"{os.getenv('SECRET_KEY')}"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = f"{os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES')}"
 EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS = f"{os.getenv('EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS')}"  # Термін дії токену для верифікації email
+TOKEN_CACHE_MAXSIZE = int(os.getenv('TOKEN_CACHE_MAXSIZE', '10000'))
+TOKEN_CACHE_DEFAULT_TTL = float(os.getenv('TOKEN_CACHE_DEFAULT_TTL', '300'))  # Для токенів без exp
+
+# Кеш перевірених токенів: ключ — SHA-256 токена, значення — розкодовані claims.
+# Кожен запис живе рівно до exp токена, тож прострочений токен знову проходить повну перевірку.
+token_cache = TTLCache(TOKEN_CACHE_MAXSIZE, TOKEN_CACHE_DEFAULT_TTL)
+
+class RevokedTokens:
+    """Список відкликаних токенів, що зберігає кожен запис до exp токена.
+
+    На відміну від TTLCache, записи не витісняються під тиском розміру: інакше токен,
+    відкликаний раніше за інші, знову проходив би перевірку. Прострочені записи
+    прибираються під час додавання нових. Список живе в пам'яті одного процесу, тож за
+    кількох робочих процесів (gunicorn) відкликання діє лише в тому процесі, де його виконано.
+    """
+
+    def __init__(self):
+        self._expires = {}
+        self._heap = []
+
+    def add(self, key, exp: float | None):
+        """Додає токен; без exp запис зберігається назавжди (такий токен сам не протермінується)."""
+        self._purge()
+        expires_at = math.inf if exp is None else exp
+        self._expires[key] = expires_at
+        if expires_at != math.inf:
+            heapq.heappush(self._heap, (expires_at, key))
+
+    def _purge(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+
+    def __contains__(self, key):
+        expires_at = self._expires.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._expires)
+
+# Відкликані токени, які ще не прострочені (лише в межах поточного процесу)
+revoked_tokens = RevokedTokens()
 
 # Функція для створення токену доступу (при вході)
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -29,10 +78,45 @@ def create_email_verification_token(email: str):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def _seconds_until_exp(payload: dict):
+    exp = payload.get("exp")
+    if exp is None:
+        return None
+    return exp - time.time()
+
+# Розкодовує токен, пропускаючи криптографію й розбір JSON для вже перевірених токенів
+def decode_token(token: str) -> dict:
+    key = _token_key(token)
+    if key in revoked_tokens:
+        raise JWTError("Token has been revoked")
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        ttl = _seconds_until_exp(payload)
+        if ttl is None or ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+# Відкликання токена (наприклад, під час виходу): він не пройде перевірку до свого exp.
+# Діє лише в поточному процесі: інші робочі процеси й далі приймають токен.
+def revoke_token(token: str):
+    key = _token_key(token)
+    token_cache.invalidate(key)
+    try:
+        payload = jwt.get_unverified_claims(token)
+    except JWTError:
+        return
+    exp = payload.get("exp")
+    if exp is None or exp > time.time():
+        revoked_tokens.add(key, exp)
+
 # Функція для перевірки токену (як доступу, так і верифікації email)
 def verify_token(token: str, credentials_exception):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
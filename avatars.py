@@ -0,0 +1,145 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from fastapi import UploadFile
+from dotenv import load_dotenv
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+
+load_dotenv()
+
+AVATAR_SIZES = tuple(int(size) for size in os.getenv('AVATAR_SIZES', '256,128,64').split(','))
+AVATAR_MAX_BYTES = int(os.getenv('AVATAR_MAX_BYTES', str(5 * 1024 * 1024)))
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', '2'))
+AVATAR_STORAGE = os.getenv('AVATAR_STORAGE', 'cloudinary')  # cloudinary або local
+AVATAR_LOCAL_DIR = os.getenv('AVATAR_LOCAL_DIR', 'media/avatars')
+AVATAR_LOCAL_URL = os.getenv('AVATAR_LOCAL_URL', '/media/avatars/')
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+class InvalidAvatar(Exception):
+    """Завантажений файл не є зображенням."""
+
+class AvatarTooLarge(Exception):
+    """Розмір файлу перевищує AVATAR_MAX_BYTES."""
+
+@dataclass
+class AvatarResult:
+    content_hash: str
+    unchanged: bool = False
+    urls: dict = field(default_factory=dict)  # розмір -> URL
+
+    @property
+    def url(self):
+        return self.urls[max(self.urls)] if self.urls else None
+
+def render_thumbnails(path: str, sizes) -> dict:
+    """Квадратні мініатюри у форматі WEBP. Виконується в окремому процесі."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            thumbnails = {}
+            for size in sizes:
+                buffer = io.BytesIO()
+                ImageOps.fit(image, (size, size), Image.LANCZOS).save(buffer, format="WEBP", quality=85)
+                thumbnails[size] = buffer.getvalue()
+            return thumbnails
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidAvatar(str(exc))
+
+class LocalStorage:
+    """Збереження аватарів у локальній теці (для розробки і тестів)."""
+
+    def __init__(self, root: str = AVATAR_LOCAL_DIR, base_url: str = AVATAR_LOCAL_URL):
+        self.root = root
+        self.base_url = base_url
+
+    def put(self, key: str, data: bytes) -> str:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            target.write(data)
+        return self.base_url + key
+
+class CloudinaryStorage:
+    """Збереження аватарів у Cloudinary (налаштування з CLOUDINARY_URL)."""
+
+    def __init__(self, folder: str = "avatars"):
+        self.folder = folder
+
+    def put(self, key: str, data: bytes) -> str:
+        from cloudinary import uploader
+
+        result = uploader.upload(io.BytesIO(data), folder=self.folder, public_id=key.rsplit(".", 1)[0],
+                                 overwrite=True, resource_type="image")
+        return result['secure_url']
+
+STORAGE_BACKENDS = {
+    "local": LocalStorage,
+    "cloudinary": CloudinaryStorage,
+}
+
+class AvatarPipeline:
+    """Завантаження аватара: потоковий запис у тимчасовий файл, хеш вмісту,
+    мініатюри в обмеженому пулі процесів і запис у сховище поза циклом подій."""
+
+    def __init__(self, storage=None, sizes=AVATAR_SIZES, max_workers: int = AVATAR_WORKERS):
+        self.storage = storage
+        self.sizes = sizes
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _get_storage(self):
+        if self.storage is None:
+            self.storage = STORAGE_BACKENDS[AVATAR_STORAGE]()
+        return self.storage
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Процес уже має потоки (bcrypt, aiosqlite, to_thread), тож не fork, а spawn
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _spool(self, file: UploadFile, target):
+        digest = hashlib.sha256()
+        size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > AVATAR_MAX_BYTES:
+                raise AvatarTooLarge()
+            digest.update(chunk)
+            # Запис на диск може блокувати, тому виконується в потоці, а не в циклі подій
+            await asyncio.to_thread(target.write, chunk)
+        await asyncio.to_thread(target.flush)
+        return digest.hexdigest()
+
+    async def save(self, user_id: int, file: UploadFile, current_hash: str | None = None) -> AvatarResult:
+        with tempfile.NamedTemporaryFile(suffix=".upload") as spooled:
+            content_hash = await self._spool(file, spooled)
+            # Той самий файл уже є аватаром користувача — нічого не завантажуємо
+            if content_hash == current_hash:
+                return AvatarResult(content_hash=content_hash, unchanged=True)
+            loop = asyncio.get_running_loop()
+            thumbnails = await loop.run_in_executor(self._get_executor(), render_thumbnails, spooled.name, self.sizes)
+
+        storage = self._get_storage()
+        keys = {size: f"{user_id}/{content_hash[:16]}_{size}.webp" for size in thumbnails}
+        urls = await asyncio.gather(*(
+            asyncio.to_thread(storage.put, keys[size], data) for size, data in thumbnails.items()
+        ))
+        return AvatarResult(content_hash=content_hash, urls=dict(zip(thumbnails, urls)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+avatar_pipeline = AvatarPipeline()
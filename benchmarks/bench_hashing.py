@@ -0,0 +1,46 @@
+"""Мікробенчмарк входу: скільки перевірок пароля bcrypt за секунду на одне ядро.
+
+Запуск із кореня проєкту:
+    python benchmarks/bench_hashing.py --logins 200 --rounds 12
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hashing import PasswordHasher
+
+async def run(logins: int, rounds: int, workers: int):
+    hasher = PasswordHasher(rounds=rounds, max_workers=workers, max_pending=logins)
+    hashed = await hasher.hash("correct horse battery staple")
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify("correct horse battery staple", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    assert all(results)
+    logins_per_second = logins / elapsed
+    return {
+        "rounds": rounds,
+        "workers": workers,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins_per_second, 2),
+        "logins_per_second_per_core": round(logins_per_second / workers, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.rounds, args.workers)), indent=2))
+
+if __name__ == "__main__":
+    main()
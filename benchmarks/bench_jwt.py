@@ -0,0 +1,53 @@
+"""Порівняння холодної і теплої перевірки JWT (auth.verify_token).
+
+Запуск із кореня проєкту:
+    python benchmarks/bench_jwt.py --iterations 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import auth
+
+class InvalidToken(Exception):
+    pass
+
+def measure(token: str, iterations: int, warm: bool):
+    auth.token_cache.clear()
+    auth.token_cache.hits = auth.token_cache.misses = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if not warm:
+            auth.token_cache.clear()
+        auth.verify_token(token, InvalidToken())
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "seconds": round(elapsed, 4),
+        "verifications_per_second": round(iterations / elapsed, 1),
+        "microseconds_per_verification": round(elapsed / iterations * 1e6, 2),
+        "cache_hits": auth.token_cache.hits,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = auth.create_access_token({"sub": "benchmark@example.com"})
+    cold = measure(token, args.iterations, warm=False)
+    warm = measure(token, args.iterations, warm=True)
+    print(json.dumps({
+        "cold": cold,
+        "warm": warm,
+        "speedup": round(cold["seconds"] / warm["seconds"], 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
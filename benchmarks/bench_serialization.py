@@ -0,0 +1,118 @@
+"""Вартість одного рядка у списках контактів: ORM + ContactInDB проти рядків + orjson.
+
+"orm" відтворює попередній шлях FastAPI: завантаження ORM-об'єктів, валідація кожного
+через ContactInDB (from_attributes), серіалізація і JSONResponse. "rows" — поточний шлях:
+лише потрібні колонки і ORJSONResponse. Тіла відповідей перевіряються на побайтову рівність.
+
+Запуск із кореня проєкту:
+    python benchmarks/bench_serialization.py --rows 10 100 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def configure_environment(db_path: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DB_SCHEMA_CHECK"] = "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    os.environ.setdefault("EMAIL_VERIFICATION_TOKEN_EXPIRE_MINUTES", "60")
+
+async def seed(engine, rows: int):
+    import models
+
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "email": "bench@example.com"}])
+        first_day = date(1970, 1, 1)
+        await conn.execute(models.Contact.__table__.insert(), [
+            {
+                "id": index,
+                "first_name": f"Олена{index}",
+                "last_name": "Шевченко",
+                "email": f"contact{index}@bench.example",
+                "phone_number": f"+38067{index:07d}",
+                "birthday": first_day + timedelta(days=index),
+                "birthday_md": models.birthday_key(first_day + timedelta(days=index)),
+                "additional_info": None if index % 3 else "notes",
+                "user_id": 1,
+            }
+            for index in range(1, rows + 1)
+        ])
+
+async def orm_path(session_factory, limit: int) -> bytes:
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from typing import List
+    import models, schemas
+
+    adapter = TypeAdapter(List[schemas.ContactInDB])
+    async with session_factory() as db:
+        contacts = (await db.scalars(
+            select(models.Contact).where(models.Contact.user_id == 1).order_by(models.Contact.id).limit(limit)
+        )).all()
+        return JSONResponse(adapter.dump_python(adapter.validate_python(contacts), mode="json")).body
+
+async def rows_path(session_factory, limit: int) -> bytes:
+    from fastapi import Response
+    import crud, main
+
+    async with session_factory() as db:
+        rows, _ = await crud.get_contacts_page(db, 1, limit=limit)
+        return main.contact_list_response(rows, Response()).body
+
+async def measure(path, session_factory, limit: int, repeat: int):
+    body = await path(session_factory, limit)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(session_factory, limit)
+    elapsed = time.perf_counter() - started
+    return body, elapsed / repeat
+
+async def run(args):
+    import config
+
+    engine = config.init_engine()
+    await seed(engine, max(args.rows))
+    results = []
+    for limit in args.rows:
+        orm_body, orm_seconds = await measure(orm_path, config.SessionLocal, limit, args.repeat)
+        rows_body, rows_seconds = await measure(rows_path, config.SessionLocal, limit, args.repeat)
+        results.append({
+            "rows": limit,
+            "orm_us_per_row": round(orm_seconds / limit * 1e6, 2),
+            "rows_us_per_row": round(rows_seconds / limit * 1e6, 2),
+            "speedup": round(orm_seconds / rows_seconds, 2),
+            "identical_body": orm_body == rows_body,
+        })
+    await config.dispose_engine()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "contacts_bench_serialization.db"))
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    configure_environment(args.db)
+    os.chdir(ROOT)
+    results = asyncio.run(run(args))
+    print(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2))
+    if not all(result["identical_body"] for result in results):
+        print("Response bodies differ", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Час холодного старту: імпорт main і запуск lifespan у свіжому процесі.
+
+Кожен запуск — окремий інтерпретатор, тож кеші модулів і з'єднання не переживають
+між вимірюваннями. База мігрується один раз перед вимірюваннями.
+
+Запуск із кореня проєкту:
+    python benchmarks/cold_start.py --runs 10 --output cold_start.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({"import_seconds": imported - started, "lifespan_seconds": ready - imported,
+                  "total_seconds": ready - started}))
+"""
+
+def environment(db_path: str):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "RATE_LIMIT_ENABLED": "false",
+        "MAIL_SUPPRESS_SEND": "true",
+        "AVATAR_STORAGE": "local",
+        "PYTHONPATH": ROOT,
+    })
+    env.setdefault("SECRET_KEY", "benchmark-secret")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    env.setdefault("EMAIL_VERIFICATION_TOKEN_EXPIRE_MINUTES", "60")
+    return env
+
+def measure(env, runs: int):
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                                   capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        key: {
+            "median_ms": round(statistics.median(sample[key] for sample in samples) * 1000, 1),
+            "max_ms": round(max(sample[key] for sample in samples) * 1000, 1),
+        }
+        for key in ("import_seconds", "lifespan_seconds", "total_seconds")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "contacts_cold_start.db"))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="файл для JSON-звіту (інакше stdout)")
+    args = parser.parse_args()
+
+    env = environment(args.db)
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, env=env,
+                   capture_output=True, check=True)
+
+    report = {"runs": args.runs, "python": sys.version.split()[0], "startup": measure(env, args.runs)}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
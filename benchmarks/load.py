@@ -0,0 +1,384 @@
+"""Навантажувальний бенчмарк API в межах одного процесу (httpx + ASGI transport).
+
+Заповнює локальну базу SQLite реалістичним обсягом даних, проганяє кожен маршрут
+і записує пропускну здатність та затримки p50/p95/p99 у JSON. З --baseline порівнює
+результат із збереженим раніше і повідомляє про регресії.
+
+Запуск із кореня проєкту:
+    python benchmarks/load.py --users 10000 --contacts 1000000 --output bench.json
+    python benchmarks/load.py --baseline bench.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST_NAMES = ["Olena", "Taras", "Iryna", "Andrii", "Oksana", "Dmytro", "Natalia", "Serhii", "Yulia", "Bohdan"]
+LAST_NAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Lysenko"]
+SEED_PASSWORD = "benchmark-password"
+
+def configure_environment(args):
+    """Оточення застосунку має бути готове до імпорту main."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["MAIL_SUPPRESS_SEND"] = "true"
+    os.environ["AVATAR_STORAGE"] = "local"
+    os.environ["AVATAR_LOCAL_DIR"] = os.path.join(tempfile.gettempdir(), "contacts_bench_avatars")
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    os.environ.setdefault("EMAIL_VERIFICATION_TOKEN_EXPIRE_MINUTES", "60")
+    os.environ.setdefault("SENDER_EMAIL", "benchmark@example.com")
+
+def contact_phone(contact_id: int) -> str:
+    """Номер контакту у форматі E.164; пошук за номером звертається до нього в національному форматі."""
+    return f"+38067{contact_id % 10 ** 7:07d}"
+
+def seed(db_path: str, users: int, contacts: int, password_hash: str):
+    """Заповнює базу напряму через sqlite3 — у рази швидше, ніж через API."""
+    connection = sqlite3.connect(db_path)
+    existing_users = connection.execute("SELECT count(*) FROM users").fetchone()[0]
+    existing_contacts = connection.execute("SELECT count(*) FROM contacts").fetchone()[0]
+    if existing_users == users and existing_contacts == contacts:
+        connection.close()
+        return False
+
+    connection.execute("DELETE FROM contacts")
+    connection.execute("DELETE FROM users")
+    connection.executemany(
+        "INSERT INTO users (id, email, hashed_password, is_active, is_verified) VALUES (?, ?, ?, 1, 1)",
+        ((user_id, f"user{user_id}@bench.example", password_hash) for user_id in range(1, users + 1)),
+    )
+
+    rng = random.Random(42)
+    per_user = max(1, contacts // users)
+    first_day = date(1950, 1, 1)
+    # Мітки змін у минулому, щоб увесь набір потрапляв у першу синхронізацію
+    seeded_at = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    def rows():
+        for contact_id in range(1, contacts + 1):
+            birthday = first_day + timedelta(days=rng.randrange(365 * 55))
+            yield (
+                contact_id,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                f"contact{contact_id}@bench.example",
+                contact_phone(contact_id),
+                contact_phone(contact_id),
+                birthday.isoformat(),
+                birthday.month * 100 + birthday.day,
+                None,
+                min(users, (contact_id - 1) // per_user + 1),
+                seeded_at,
+                seeded_at,
+            )
+
+    connection.executemany(
+        "INSERT INTO contacts (id, first_name, last_name, email, phone_number, phone_e164, birthday, birthday_md, "
+        "additional_info, user_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows(),
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+    return True
+
+def migrate():
+    """Схему створюють міграції: застосунок під час старту лише перевіряє ревізію."""
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head")
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def png_bytes(seed_value: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (512, 512), (seed_value % 256, (seed_value * 7) % 256, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class Scenarios:
+    """Запити для кожного маршруту. Кожен метод виконує один запит і повертає відповідь."""
+
+    def __init__(self, users: int, contacts: int):
+        import auth
+        from token_utils import create_email_verification_token
+
+        self.users = users
+        self.per_user = max(1, contacts // users)
+        self.rng = random.Random(7)
+        self.sequence = 0
+        self.created = []
+        self.auth = auth
+        self.email_token = create_email_verification_token
+        self.avatars = [png_bytes(index) for index in range(4)]
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def random_user(self):
+        return self.rng.randrange(1, self.users + 1)
+
+    def headers(self, user_id: int):
+        token = self.auth.create_access_token({"sub": f"user{user_id}@bench.example"})
+        return {"Authorization": f"Bearer {token}"}
+
+    def own_contact(self, user_id: int):
+        return (user_id - 1) * self.per_user + self.rng.randrange(1, self.per_user + 1)
+
+    def contact_payload(self):
+        sequence = self.next_sequence()
+        return {
+            "first_name": self.rng.choice(FIRST_NAMES),
+            "last_name": self.rng.choice(LAST_NAMES),
+            "email": f"new{sequence}-{time.time_ns()}@bench.example",
+            "phone_number": f"+38050{sequence % 10 ** 7:07d}",
+            "birthday": "1990-05-17",
+        }
+
+    async def register(self, client):
+        email = f"register{self.next_sequence()}-{time.time_ns()}@bench.example"
+        return await client.post("/register", json={"email": email, "password": SEED_PASSWORD})
+
+    async def verify_email(self, client):
+        token = self.email_token(f"user{self.random_user()}@bench.example")
+        return await client.get("/verify-email", params={"token": token})
+
+    async def token(self, client):
+        email = f"user{self.random_user()}@bench.example"
+        return await client.post("/token", data={"username": email, "password": SEED_PASSWORD})
+
+    async def list_contacts(self, client):
+        return await client.get("/contacts/", params={"limit": 20}, headers=self.headers(self.random_user()))
+
+    async def read_contact(self, client):
+        user_id = self.random_user()
+        return await client.get(f"/contacts/{self.own_contact(user_id)}", headers=self.headers(user_id))
+
+    async def by_phone(self, client):
+        user_id = self.random_user()
+        number = "0" + contact_phone(self.own_contact(user_id))[4:]
+        return await client.get(f"/contacts/by-phone/{number}", headers=self.headers(user_id))
+
+    async def changes(self, client):
+        return await client.get("/contacts/changes", params={"limit": 100}, headers=self.headers(self.random_user()))
+
+    async def search(self, client):
+        query = self.rng.choice(FIRST_NAMES + LAST_NAMES)[:4]
+        return await client.get("/contacts/search/", params={"query": query}, headers=self.headers(self.random_user()))
+
+    async def upcoming_birthdays(self, client):
+        return await client.get("/contacts/upcoming-birthdays/", headers=self.headers(self.random_user()))
+
+    async def create_contact(self, client):
+        user_id = self.random_user()
+        response = await client.post("/contacts/", json=self.contact_payload(), headers=self.headers(user_id))
+        if response.status_code == 200:
+            self.created.append((user_id, response.json()["id"]))
+        return response
+
+    async def update_contact(self, client):
+        user_id = self.random_user()
+        return await client.put(f"/contacts/{self.own_contact(user_id)}", json=self.contact_payload(),
+                                headers=self.headers(user_id))
+
+    async def delete_contact(self, client):
+        user_id, contact_id = self.created.pop() if self.created else (self.random_user(), 0)
+        return await client.delete(f"/contacts/{contact_id}", headers=self.headers(user_id))
+
+    async def batch_update(self, client):
+        user_id = self.random_user()
+        ids = {self.own_contact(user_id) for _ in range(20)}
+        items = [{"id": contact_id, "additional_info": f"batch {self.next_sequence()}"} for contact_id in ids]
+        return await client.patch("/contacts/batch", json={"items": items}, headers=self.headers(user_id))
+
+    async def batch_delete(self, client):
+        batch = [self.created.pop() for _ in range(min(20, len(self.created)))]
+        user_id = batch[0][0] if batch else self.random_user()
+        ids = [contact_id for owner, contact_id in batch if owner == user_id] or [0]
+        return await client.post("/contacts/batch-delete", json={"ids": ids}, headers=self.headers(user_id))
+
+    async def import_contacts(self, client):
+        lines = ["first_name,last_name,email,phone_number,birthday"]
+        for _ in range(20):
+            payload = self.contact_payload()
+            lines.append(",".join(payload[field] for field in ("first_name", "last_name", "email", "phone_number", "birthday")))
+        files = {"file": ("contacts.csv", "\n".join(lines), "text/csv")}
+        return await client.post("/contacts/import", files=files, headers=self.headers(self.random_user()))
+
+    async def export_contacts(self, client):
+        return await client.get("/contacts/export", headers=self.headers(self.random_user()))
+
+    async def avatar(self, client):
+        data = self.rng.choice(self.avatars)
+        files = {"file": ("avatar.png", data, "image/png")}
+        return await client.post("/users/me/avatar", files=files, headers=self.headers(self.random_user()))
+
+# Порядок важливий: delete і batch_delete видаляють контакти, створені в create
+ENDPOINTS = [
+    ("register", "register"),
+    ("verify_email", "verify_email"),
+    ("token", "token"),
+    ("list", "list_contacts"),
+    ("read", "read_contact"),
+    ("by_phone", "by_phone"),
+    ("changes", "changes"),
+    ("search", "search"),
+    ("birthdays", "upcoming_birthdays"),
+    ("create", "create_contact"),
+    ("update", "update_contact"),
+    ("batch_update", "batch_update"),
+    ("delete", "delete_contact"),
+    ("batch_delete", "batch_delete"),
+    ("import", "import_contacts"),
+    ("export", "export_contacts"),
+    ("avatar", "avatar"),
+]
+
+async def run_endpoint(client, request, total: int, concurrency: int, warmup: int):
+    for _ in range(warmup):
+        await request(client)
+
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await request(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+async def run(args):
+    import httpx
+    from passlib.context import CryptContext
+    migrate()
+    import main
+
+    results = {}
+    startup_started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        startup_seconds = time.perf_counter() - startup_started
+        password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.bcrypt_rounds).hash(SEED_PASSWORD)
+        seed_started = time.perf_counter()
+        seeded = seed(args.db, args.users, args.contacts, password_hash)
+        seed_seconds = time.perf_counter() - seed_started
+
+        scenarios = Scenarios(args.users, args.contacts)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, method in ENDPOINTS:
+                if args.only and name not in args.only:
+                    continue
+                results[name] = await run_endpoint(client, getattr(scenarios, method), args.requests,
+                                                   args.concurrency, args.warmup)
+                print(f"{name:>12}: {results[name]['throughput_rps']:>9} req/s  "
+                      f"p50 {results[name]['p50_ms']} ms  p95 {results[name]['p95_ms']} ms  "
+                      f"p99 {results[name]['p99_ms']} ms  errors {results[name]['errors']}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "users": args.users,
+            "contacts": args.contacts,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "seeded": seeded,
+            "seed_seconds": round(seed_seconds, 2),
+            "startup_seconds": round(startup_seconds, 3),
+            "python": sys.version.split()[0],
+        },
+        "endpoints": results,
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float):
+    """Регресія — якщо p95 виріс або пропускна здатність упала більше ніж на tolerance."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        p95_change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        throughput_change = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        current["vs_baseline"] = {"p95_change": round(p95_change, 4), "throughput_change": round(throughput_change, 4)}
+        if p95_change > tolerance or throughput_change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "contacts_bench.db"))
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--contacts", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=200, help="запитів на кожен маршрут")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--only", nargs="*", help="лише вказані маршрути")
+    parser.add_argument("--output", help="файл для JSON-звіту (інакше stdout)")
+    parser.add_argument("--baseline", help="JSON-звіт попереднього запуску для порівняння")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    os.chdir(ROOT)
+    report = asyncio.run(run(args))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as source:
+            regressions = compare(report, json.load(source), args.tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output + "\n")
+    else:
+        print(output)
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
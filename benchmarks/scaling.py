@@ -0,0 +1,175 @@
+"""Масштабування пропускної здатності за кількістю робочих процесів gunicorn.
+
+Для кожного значення --workers запускає gunicorn -c gunicorn.conf.py на локальному порту,
+навантажує один маршрут через справжній TCP з кількох клієнтських процесів протягом
+--duration секунд і записує запити за секунду, затримки і прискорення відносно першого запуску.
+Клієнтів варто запускати на інших ядрах або машині, інакше вони конкурують із сервером.
+
+Запуск із кореня проєкту:
+    python benchmarks/scaling.py --workers 1 2 4 --endpoint list --duration 15
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load import configure_environment, contact_phone, migrate, percentile, seed, SEED_PASSWORD  # noqa: E402
+
+def request_for(endpoint: str, users: int, per_user: int):
+    """Функція, що повертає (шлях, номер користувача) для наступного запиту."""
+    def make(rng):
+        user_id = rng.randrange(1, users + 1)
+        contact_id = (user_id - 1) * per_user + rng.randrange(1, per_user + 1)
+        if endpoint == "list":
+            return "/contacts/?limit=20", user_id
+        if endpoint == "read":
+            return f"/contacts/{contact_id}", user_id
+        if endpoint == "by_phone":
+            return f"/contacts/by-phone/0{contact_phone(contact_id)[4:]}", user_id
+        return "/contacts/upcoming-birthdays/", user_id
+    return make
+
+def client_process(base_url, tokens, endpoint, users, per_user, concurrency, duration, seed_value, queue):
+    import httpx
+
+    make = request_for(endpoint, users, per_user)
+    rng = random.Random(seed_value)
+
+    async def run():
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            async def worker():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    path, user_id = make(rng)
+                    started = time.perf_counter()
+                    response = await client.get(path, headers={"Authorization": f"Bearer {tokens[user_id]}"})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code >= 400:
+                        errors += 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors
+
+    queue.put(asyncio.run(run()))
+
+def wait_until_ready(base_url: str, server, timeout: float = 60):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            if httpx.get(f"{base_url}/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start in time")
+
+def run_workers(args, workers: int, tokens, per_user: int):
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{args.port}", ACCESS_LOG="",
+               LOG_LEVEL="warning")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"], cwd=ROOT, env=env)
+    try:
+        wait_until_ready(base_url, server)
+        queue = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client_process, args=(
+                base_url, tokens, args.endpoint, args.users, per_user, args.concurrency, args.duration, index, queue))
+            for index in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        results = [queue.get() for _ in clients]
+        for client in clients:
+            client.join()
+    finally:
+        # SIGTERM — штатне завершення з дочікуванням запитів (graceful_timeout)
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = sorted(value for result in results for value in result[0])
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(result[1] for result in results),
+        "throughput_rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "contacts_scaling.db"))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(1, os.cpu_count() // 2), os.cpu_count()}))
+    parser.add_argument("--endpoint", choices=["list", "read", "by_phone", "birthdays"], default="list")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16, help="одночасних запитів на клієнтський процес")
+    parser.add_argument("--clients", type=int, default=2, help="клієнтських процесів")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--output", help="файл для JSON-звіту (інакше stdout)")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    os.chdir(ROOT)
+    migrate()
+
+    from passlib.context import CryptContext
+    import auth
+
+    password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.bcrypt_rounds).hash(SEED_PASSWORD)
+    seed(args.db, args.users, args.contacts, password_hash)
+    tokens = {user_id: auth.create_access_token({"sub": f"user{user_id}@bench.example"})
+              for user_id in range(1, args.users + 1)}
+    per_user = max(1, args.contacts // args.users)
+
+    results = []
+    for workers in args.workers:
+        result = run_workers(args, workers, tokens, per_user)
+        result["speedup"] = round(result["throughput_rps"] / results[0]["throughput_rps"], 2) if results else 1.0
+        results.append(result)
+        print(f"{workers:>3} workers: {result['throughput_rps']:>9} req/s  p95 {result['p95_ms']} ms  "
+              f"speedup {result['speedup']}  errors {result['errors']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "endpoint": args.endpoint,
+            "users": args.users,
+            "contacts": args.contacts,
+            "cpu_count": os.cpu_count(),
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
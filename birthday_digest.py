@@ -0,0 +1,131 @@
+"""Щоденна розсилка нагадувань про дні народження контактів.
+
+Користувачі обходяться пачками за id (пагінація за ключем); дні народження для всієї пачки
+вибираються одним запитом. Кожен користувач отримує один лист, листи йдуть через чергу
+mailer з пулом SMTP-з'єднань і лімітом MAIL_RATE_PER_SECOND. Після кожної надісланої пачки
+прогрес зберігається в job_checkpoints, тож перезапуск продовжує з місця зупинки, а повторний
+запуск за той самий день нічого не надсилає. Доставка — щонайменше один раз: після збою
+можуть повторитися листи лише з останньої незбереженої пачки.
+
+Запуск (наприклад, з cron щодня о 08:00):
+    python birthday_digest.py
+    python birthday_digest.py --date 2024-05-01 --days 7 --batch-size 500
+
+Локальна перевірка без справжнього SMTP-сервера:
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_START_TLS=false SENDER_PASSWORD= python birthday_digest.py
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from dotenv import load_dotenv
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+load_dotenv()
+
+import config
+import crud
+from config import BIRTHDAY_WINDOW_DAYS
+from mailer import SENDER_EMAIL, mail_queue, render, build_message
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "birthday_digest"
+BIRTHDAY_DIGEST_BATCH_SIZE = int(os.getenv('BIRTHDAY_DIGEST_BATCH_SIZE', '500'))  # Користувачів за один запит
+BIRTHDAY_DIGEST_DAYS = int(os.getenv('BIRTHDAY_DIGEST_DAYS', str(BIRTHDAY_WINDOW_DAYS)))
+
+def next_birthday(birthday: date, today: date) -> date:
+    """Найближча дата дня народження, не раніше today (29 лютого в невисокосний рік — 28-го)."""
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = birthday.replace(year=year)
+        except ValueError:
+            candidate = date(year, 2, 28)
+        if candidate >= today:
+            return candidate
+
+def digest_items(rows, today: date):
+    items = []
+    for row in rows:
+        upcoming = next_birthday(row.birthday, today)
+        items.append({
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "email": row.email,
+            "phone_number": row.phone_number,
+            "date": upcoming,
+            "days_left": (upcoming - today).days,
+            "age": upcoming.year - row.birthday.year,
+        })
+    return items
+
+async def run_digest(today: date, days: int = BIRTHDAY_DIGEST_DAYS, batch_size: int = BIRTHDAY_DIGEST_BATCH_SIZE):
+    stats = {"date": today.isoformat(), "users": 0, "digests": 0, "batches": 0, "resumed_from": 0, "skipped": False}
+    async with config.SessionLocal() as db:
+        checkpoint = await crud.get_job_checkpoint(db, JOB_NAME, today)
+        if checkpoint.completed_at is not None:
+            logger.info("Birthday digest for %s already completed", today)
+            stats["skipped"] = True
+            return stats
+
+        after_id, sent = checkpoint.last_user_id, checkpoint.processed
+        stats["resumed_from"] = after_id
+        while True:
+            users = await crud.get_users_batch(db, after_id, batch_size)
+            if not users:
+                break
+            rows = await crud.get_upcoming_birthdays_for_users(db, [user.id for user in users], today, days)
+            by_user = defaultdict(list)
+            for row in rows:
+                by_user[row.user_id].append(row)
+
+            for user in users:
+                if user.id not in by_user:
+                    continue
+                html_content = render('birthday_digest.html', username=user.email.split('@')[0], days=days,
+                                      birthdays=digest_items(by_user[user.id], today))
+                # Фонове завдання чекає на місце в черзі, а не відкидає листи
+                await mail_queue.put(build_message(user.email, "Upcoming birthdays", html_content))
+                stats["digests"] += 1
+
+            # Контрольна точка — лише після того, як листи пачки пішли з черги
+            await mail_queue.flush()
+            after_id = users[-1].id
+            sent += len(by_user)
+            await crud.save_job_checkpoint(db, checkpoint, after_id, sent)
+            stats["users"] += len(users)
+            stats["batches"] += 1
+            if len(users) < batch_size:
+                break
+
+        await crud.save_job_checkpoint(db, checkpoint, after_id, sent, completed=True)
+    return stats
+
+async def main(today: date, days: int, batch_size: int):
+    if not SENDER_EMAIL:
+        raise ValueError("SENDER_EMAIL is not set in environment variables")
+    engine = config.init_engine(replica_urls=())
+    try:
+        if config.DB_SCHEMA_CHECK:
+            await config.check_schema_revision(engine)
+        await mail_queue.start()
+        try:
+            stats = await run_digest(today, days, batch_size)
+        finally:
+            await mail_queue.stop()
+        return {**stats, "mail": mail_queue.stats()}
+    finally:
+        await config.dispose_engine()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, default=datetime.now().date())
+    parser.add_argument("--days", type=int, default=BIRTHDAY_DIGEST_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BIRTHDAY_DIGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    print(json.dumps(asyncio.run(main(args.date, args.days, args.batch_size)), indent=2))
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+import os
+import time
+
+load_dotenv()
+
+USER_CACHE_MAXSIZE = int(os.getenv('USER_CACHE_MAXSIZE', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+
+_MISSING = object()
+
+class TTLCache:
+    """Обмежений LRU-кеш із терміном життя записів і лічильниками звернень."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        """Зберігає значення; ttl задає власний термін життя запису замість типового."""
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+# Кеш автентифікованих користувачів (ключ — email із токена)
+user_cache = TTLCache(USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS)
@@ -1,20 +1,284 @@
-from sqlalchemy import create_engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from fastapi import Request
 from dotenv import load_dotenv
+from jose import JWTError
+from cache import TTLCache
+import auth
+import asyncio
+import logging
 import os
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Репліки лише для читання (через кому); без них читання йде на основну базу
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.getenv('REPLICA_HEALTH_INTERVAL', '5'))  # Секунди між перевірками реплік
+REPLICA_HEALTH_TIMEOUT = float(os.getenv('REPLICA_HEALTH_TIMEOUT', '2'))
+# Скільки секунд після запису користувач читає з основної бази (репліки можуть відставати)
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+
+# Налаштування пулу з'єднань (на один процес)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # Секунди очікування вільного з'єднання
+# Кількість робочих процесів (gunicorn / uvicorn --workers) і загальний ліміт з'єднань до однієї бази
+# на всі процеси разом; 0 — без ліміту (DB_POOL_SIZE + DB_MAX_OVERFLOW на кожен процес)
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '0'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_POOL_WARM = int(os.getenv('DB_POOL_WARM', str(min(DB_POOL_SIZE, 2))))  # З'єднань, що відкриваються під час старту
+DB_SCHEMA_CHECK = os.getenv('DB_SCHEMA_CHECK', 'true').lower() in ('1', 'true', 'yes')
+
+# Максимальна кількість елементів у пакетних змінах контактів
+CONTACT_BATCH_MAX_ITEMS = int(os.getenv('CONTACT_BATCH_MAX_ITEMS', '500'))
+
+# Зміни, новіші за цей лаг (секунди), віддаються наступною синхронізацією: транзакція з ранішою
+# міткою updated_at може зафіксуватися пізніше, і без лагу клієнт пропустив би її
+SYNC_SAFETY_LAG_SECONDS = float(os.getenv('SYNC_SAFETY_LAG_SECONDS', '2'))
+
+# Кеш пошуку контактів за номером телефону (вхідні дзвінки). Кеш живе в кожному процесі окремо:
+# зміна номера скидає його лише в процесі, що її виконав, а інші процеси можуть віддавати старий
+# результат до PHONE_CACHE_TTL_SECONDS секунд. 0 — без кешу
+PHONE_CACHE_MAXSIZE = int(os.getenv('PHONE_CACHE_MAXSIZE', '10000'))
+PHONE_CACHE_TTL_SECONDS = float(os.getenv('PHONE_CACHE_TTL_SECONDS', '5'))
+
+# Кількість днів наперед для пошуку днів народження за замовчуванням
+BIRTHDAY_WINDOW_DAYS = int(os.getenv('BIRTHDAY_WINDOW_DAYS', '7'))
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini')
+
+# Асинхронні драйвери для синхронних URL (alembic і далі працює через psycopg2)
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def get_async_url(url: str) -> str:
+    """Перетворює URL бази даних на URL з асинхронним драйвером."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.drivername != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url.render_as_string(hide_password=False)
+
+def pool_limits(budget: int = DB_CONNECTION_BUDGET, workers: int = WEB_CONCURRENCY,
+                pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW):
+    """(pool_size, max_overflow) одного процесу: разом усі процеси не перевищують бюджет з'єднань."""
+    if budget <= 0:
+        return pool_size, max_overflow
+    per_worker = max(1, budget // max(1, workers))
+    size = min(pool_size, per_worker)
+    return size, per_worker - size
+
+def create_engine(url: str = DATABASE_URL):
+    """Створює асинхронний рушій з налаштуваннями пулу з оточення."""
+    async_url = get_async_url(url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    is_sqlite = make_url(async_url).get_backend_name() == 'sqlite'
+    # SQLite не використовує QueuePool, тому розмір пулу для неї не задаємо
+    if not is_sqlite:
+        pool_size, max_overflow = pool_limits()
+        if 0 < DB_CONNECTION_BUDGET < WEB_CONCURRENCY:
+            logger.warning("DB_CONNECTION_BUDGET=%d is below WEB_CONCURRENCY=%d: each worker still needs "
+                           "one connection", DB_CONNECTION_BUDGET, WEB_CONCURRENCY)
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT)
+        logger.info("Process %d: connection pool %d + %d overflow", os.getpid(), pool_size, max_overflow)
+    engine = create_async_engine(async_url, **options)
+    if is_sqlite:
+        event.listen(engine.sync_engine, 'connect', _configure_sqlite)
+    return engine
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL дозволяє читати під час запису, а busy_timeout — чекати на блокування замість помилки
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+class ReplicaRouter:
+    """Розподіляє читання між репліками по колу, пропускаючи ті, що не відповідають."""
+
+    def __init__(self, interval: float = REPLICA_HEALTH_INTERVAL, timeout: float = REPLICA_HEALTH_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self.engines = []
+        self.healthy = []
+        self._next = 0
+        self._task = None
+
+    def add(self, engine):
+        self.engines.append(engine)
+        self.healthy.append(True)
+
+    def choose(self):
+        """Наступна справна репліка або None, якщо справних немає."""
+        for _ in range(len(self.engines)):
+            index = self._next % len(self.engines)
+            self._next += 1
+            if self.healthy[index]:
+                return self.engines[index]
+        return None
+
+    def mark_unhealthy(self, engine):
+        index = self.engines.index(engine)
+        if self.healthy[index]:
+            logger.warning("Replica %s is unavailable, reads go elsewhere", engine.url.render_as_string())
+        self.healthy[index] = False
+
+    async def _probe(self, engine):
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with engine.connect() as conn:
+                    await conn.execute(text('SELECT 1'))
+            return True
+        except Exception:
+            return False
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async def check(self):
+        results = await asyncio.gather(*(self._probe(engine) for engine in self.engines))
+        for index, (engine, healthy) in enumerate(zip(self.engines, results)):
+            if healthy and not self.healthy[index]:
+                logger.info("Replica %s is back", engine.url.render_as_string())
+            elif not healthy:
+                self.mark_unhealthy(engine)
+            self.healthy[index] = healthy
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def start(self):
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.gather(*(engine.dispose() for engine in self.engines))
+        self.engines, self.healthy = [], []
+
+    def stats(self):
+        return {"replicas": len(self.engines), "healthy": sum(self.healthy)}
+
+# Сесія основної бази: після кожного commit користувач тимчасово читає з неї ж
+class PrimarySession(Session):
+    pass
+
+# Рушії створюються під час старту застосунку (lifespan), тобто в кожному робочому процесі
+# після fork, а не під час імпорту — з'єднання ніколи не успадковуються від батьківського процесу
+engine = None
+replicas = ReplicaRouter()
+SessionLocal = async_sessionmaker(class_=AsyncSession, sync_session_class=PrimarySession,
+                                  autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Користувачі (sub токена), які нещодавно писали в основну базу
+recent_writers = TTLCache(maxsize=100000, ttl=READ_YOUR_WRITES_SECONDS)
+
+@event.listens_for(PrimarySession, 'after_commit')
+def _remember_writer(session):
+    key = session.info.get('sticky_key')
+    if key is not None and READ_YOUR_WRITES_SECONDS > 0:
+        recent_writers.set(key, True)
+
+def sticky_key(request: Request):
+    """Ключ користувача (sub токена): після запису читання з основної бази для всіх його токенів і пристроїв."""
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        sub = auth.decode_token(token).get('sub')
+    except JWTError:
+        return None
+    return f'user:{sub}' if sub else None
+
+def init_engine(url: str = DATABASE_URL, replica_urls=DATABASE_REPLICA_URLS):
+    global engine
+    if engine is None:
+        engine = create_engine(url)
+        SessionLocal.configure(bind=engine)
+        ReadSessionLocal.configure(bind=engine)
+        for replica_url in replica_urls:
+            replicas.add(create_engine(replica_url))
+    return engine
+
+async def dispose_engine():
+    global engine
+    await replicas.close()
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+def migration_heads():
+    """Ревізії head з alembic/versions (без підключення до бази даних)."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    alembic_cfg = Config(ALEMBIC_INI)
+    # script_location в alembic.ini відносний до поточного каталогу; застосунок може стартувати з будь-якого
+    alembic_cfg.set_main_option('script_location', os.path.join(os.path.dirname(ALEMBIC_INI), 'alembic'))
+    return set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+
+async def check_schema_revision(engine):
+    """Одним запитом перевіряє, що база мігрована до head; інакше зупиняє старт."""
+    heads = migration_heads()
     try:
+        async with engine.connect() as conn:
+            current = set((await conn.execute(text('SELECT version_num FROM alembic_version'))).scalars())
+    except DBAPIError:
+        current = set()
+    if current != heads:
+        raise RuntimeError(
+            f"Database schema revision {sorted(current) or 'none'} does not match migrations head "
+            f"{sorted(heads)}; run 'alembic upgrade head'"
+        )
+
+async def warm_pool(engine, connections: int = DB_POOL_WARM):
+    """Відкриває з'єднання заздалегідь, щоб перші запити не чекали на встановлення з'єднання."""
+    pool = engine.sync_engine.pool
+    if hasattr(pool, 'size'):
+        connections = min(connections, pool.size())
+    if connections <= 0:
+        return
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)))
+    for conn in opened:
+        await conn.close()
+
+# Сесія основної бази для запитів, що змінюють дані
+async def get_db(request: Request):
+    async with SessionLocal(info={'sticky_key': sticky_key(request)}) as db:
         yield db
-    finally:
-        db.close()
+
+def read_session(key: str | None = None):
+    """Сесія лише для читання: репліка по колу або основна база одразу після запису користувача."""
+    replica = None if key is not None and key in recent_writers else replicas.choose()
+    if replica is None:
+        return ReadSessionLocal(), None
+    return ReadSessionLocal(bind=replica), replica
+
+# Сесія для маршрутів, що лише читають дані
+async def get_read_db(request: Request):
+    db, replica = read_session(sticky_key(request))
+    async with db:
+        try:
+            yield db
+        except (OperationalError, InterfaceError):
+            # З'єднання з реплікою обірвалося — наступні читання підуть на інші
+            if replica is not None:
+                replicas.mark_unhealthy(replica)
+            raise
@@ -0,0 +1,206 @@
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from dotenv import load_dotenv
+from typing import BinaryIO
+import asyncio
+import codecs
+import csv
+import io
+import itertools
+import json
+import os
+import crud, models, schemas
+from config import read_session
+
+load_dotenv()
+
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '1000'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '1000'))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+READ_CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("csv", "ndjson")
+
+# Колонки експорту в порядку полів schemas.ContactInDB
+EXPORT_FIELDS = ["first_name", "last_name", "email", "phone_number", "birthday", "additional_info", "id"]
+
+def detect_format(filename: str | None, content_type: str | None) -> str | None:
+    """Визначає формат файлу імпорту за розширенням або типом вмісту."""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return None
+
+class ImportFileError(Exception):
+    """Файл імпорту не є текстом UTF-8."""
+
+def _check_utf8(file: BinaryIO):
+    """Перевіряє кодування всього файлу до імпорту, щоб не зупинятися посеред уже записаних пачок."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError as exc:
+        raise ImportFileError(str(exc))
+    finally:
+        file.seek(0)
+
+def _iter_csv(text):
+    # Рядки файлу рахуємо самі: після csv.Error reader.line_num не враховує збійний рядок
+    lines_read = 0
+
+    def lines():
+        nonlocal lines_read
+        for line in text:
+            lines_read += 1
+            yield line
+
+    reader = csv.DictReader(lines())
+    while True:
+        before = lines_read
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield lines_read, exc
+            # Читач не просунувся — решту файлу розібрати не вдасться
+            if lines_read == before:
+                return
+            continue
+        # Порожні клітинки вважаємо відсутніми значеннями
+        yield lines_read, {key: value for key, value in record.items() if key and value != ""}
+
+def _iter_records(file: BinaryIO, fmt: str):
+    """Читає файл потоково і повертає пари (номер рядка, словник полів або помилка)."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            yield from _iter_csv(text)
+        else:
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield line_number, exc
+                    continue
+                yield line_number, record
+    finally:
+        text.detach()
+
+async def _insert_chunk(db: AsyncSession, chunk):
+    """Вставляє пачку одним багаторядковим INSERT у власній транзакції.
+
+    У разі конфлікту пачка відкочується і вставляється по одному рядку, щоб знайти збійні.
+    """
+    try:
+        await db.execute(insert(models.Contact), [values for _, values in chunk])
+        await db.commit()
+        return len(chunk), []
+    except IntegrityError:
+        await db.rollback()
+    inserted, errors = 0, []
+    for line_number, values in chunk:
+        try:
+            await db.execute(insert(models.Contact), [values])
+            await db.commit()
+            inserted += 1
+        except IntegrityError:
+            await db.rollback()
+            errors.append({"row": line_number, "error": "Contact with this email already exists"})
+    return inserted, errors
+
+async def _read_in_thread(records, size: int = IMPORT_CHUNK_SIZE):
+    while batch := await asyncio.to_thread(lambda: list(itertools.islice(records, size))):
+        for item in batch:
+            yield item
+
+async def import_contacts(db: AsyncSession, user_id: int, file: BinaryIO, fmt: str):
+    """Імпорт контактів користувача пачками по IMPORT_CHUNK_SIZE рядків.
+
+    ImportFileError, якщо файл не в UTF-8: тоді нічого не імпортується.
+    """
+    imported, failed, errors = 0, 0, []
+
+    def add_error(line_number, error):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"row": line_number, "error": error})
+
+    async def flush(chunk):
+        nonlocal imported
+        count, chunk_errors = await _insert_chunk(db, chunk)
+        imported += count
+        for error in chunk_errors:
+            add_error(error["row"], error["error"])
+
+    # Файл читається і розбирається в потоці пачками, щоб не блокувати цикл подій
+    await asyncio.to_thread(_check_utf8, file)
+    records = _iter_records(file, fmt)
+    chunk = []
+    async for line_number, record in _read_in_thread(records):
+        if isinstance(record, Exception) or not isinstance(record, dict):
+            add_error(line_number, "Malformed record")
+            continue
+        try:
+            contact = schemas.ContactCreate.model_validate(record)
+        except ValidationError as exc:
+            add_error(line_number, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+            ))
+            continue
+        values = crud.contact_values(contact)
+        values["user_id"] = user_id
+        chunk.append((line_number, values))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+    if imported:
+        crud.mark_contacts_changed(user_id)
+    # Помилки обмежень з'являються лише під час вставки пачки, тож впорядковуємо за номером рядка
+    errors.sort(key=lambda error: error["row"])
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+async def export_contacts(user_id: int, fmt: str, sticky_key: str | None = None):
+    """Потоковий експорт контактів через серверний курсор із постійним споживанням пам'яті.
+
+    Генератор відкриває власну сесію читання (репліка або основна база одразу після запису):
+    сесія запиту закривається до того, як почнеться передача відповіді.
+    """
+    columns = [getattr(models.Contact, field) for field in EXPORT_FIELDS]
+    query = (
+        select(*columns)
+        .where(models.Contact.user_id == user_id, crud.CONTACT_NOT_DELETED)
+        .order_by(models.Contact.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if fmt == "csv":
+        yield _csv_line(EXPORT_FIELDS)
+    db, _ = read_session(sticky_key)
+    async with db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield "".join(_csv_line(row) for row in rows)
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for row in rows
+                )
@@ -1,95 +1,465 @@
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select, insert, update, bindparam, or_, case, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+import base64
+import binascii
+import calendar
+import json
+import time
 import models, schemas
+from config import SYNC_SAFETY_LAG_SECONDS, PHONE_CACHE_MAXSIZE, PHONE_CACHE_TTL_SECONDS
+from cache import TTLCache, user_cache
+from phones import normalize_phone
+from hashing import password_hasher
 from models import User
 from schemas import UserCreate
 
-# Функції CRUD для контактів
-def create_contact(db: Session, contact: schemas.ContactCreate):
-    db_contact = models.Contact(**contact.model_dump())
-    db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+# Колонки списків контактів: поля ContactInDB у тому ж порядку плюс version для ETag.
+# Списки повертають рядки (Row) замість ORM-об'єктів — без identity map і гідратації.
+CONTACT_ROW_FIELDS = tuple(schemas.ContactInDB.model_fields)
+CONTACT_ROW_COLUMNS = [getattr(models.Contact, field) for field in CONTACT_ROW_FIELDS] + [models.Contact.version]
+
+# Видалені контакти лишаються в таблиці як мітки для синхронізації — читання їх пропускають
+CONTACT_NOT_DELETED = models.Contact.deleted_at.is_(None)
+
+class VersionConflict(Exception):
+    """Контакт змінився після того, як клієнт його прочитав (If-Match)."""
+
+# Похідні колонки для змінених полів контакту
+def derived_values(values: dict):
+    derived = {}
+    if "birthday" in values:
+        derived["birthday_md"] = models.birthday_key(values["birthday"])
+    if "phone_number" in values:
+        derived["phone_e164"] = normalize_phone(values["phone_number"])
+    return derived
+
+# Значення колонок контакту разом із похідними полями
+def contact_values(contact: schemas.ContactBase):
+    values = contact.model_dump()
+    values.update(derived_values(values))
+    return values
+
+# Кеш пошуку за номером: (user_id, номер E.164) -> (час читання, рядки).
+# У цьому процесі запис дійсний, лише якщо прочитаний після останньої зміни контактів користувача;
+# зміни в інших процесах не видно, тож там запис може бути застарілим до PHONE_CACHE_TTL_SECONDS.
+phone_cache = TTLCache(PHONE_CACHE_MAXSIZE, PHONE_CACHE_TTL_SECONDS)
+contact_writes = TTLCache(max(PHONE_CACHE_MAXSIZE * 10, 100000), PHONE_CACHE_TTL_SECONDS)
+
+def mark_contacts_changed(user_id: int):
+    contact_writes.set(user_id, time.monotonic())
+
+class ContactEmailExists(Exception):
+    """Контакт з таким email вже існує (порушення унікального обмеження)."""
+
+# Чи спричинене IntegrityError саме унікальним індексом index_name на колонці table.column.
+# asyncpg повідомляє назву обмеження, SQLite — лише текст "UNIQUE constraint failed: table.column".
+def is_unique_violation(exc: IntegrityError, index_name: str, column: str) -> bool:
+    constraint = getattr(exc.orig.__cause__, "constraint_name", None)
+    if constraint is not None:
+        return constraint == index_name
+    return f"UNIQUE constraint failed: {column}" in str(exc.orig)
+
+def _is_contact_email_conflict(exc: IntegrityError) -> bool:
+    return is_unique_violation(exc, "ix_contacts_email", "contacts.email")
+
+# Функції CRUD для контактів.
+# Кожен запис — одна інструкція INSERT/UPDATE/DELETE ... RETURNING, власник перевіряється в WHERE.
+async def create_contact(db: AsyncSession, user_id: int, contact: schemas.ContactCreate):
+    stmt = insert(models.Contact).values(**contact_values(contact), user_id=user_id).returning(models.Contact)
+    try:
+        db_contact = await db.scalar(stmt)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_contact_email_conflict(exc):
+            raise ContactEmailExists()
+        raise
+    mark_contacts_changed(user_id)
     return db_contact
 
-def get_contact(db: Session, contact_id: int):
-    return db.query(models.Contact).filter(models.Contact.id == contact_id).first()
+async def get_contact(db: AsyncSession, contact_id: int, user_id: int | None = None):
+    query = select(models.Contact).filter(models.Contact.id == contact_id, CONTACT_NOT_DELETED)
+    if user_id is not None:
+        query = query.filter(models.Contact.user_id == user_id)
+    return await db.scalar(query)
+
+async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 100):
+    query = select(models.Contact).filter(CONTACT_NOT_DELETED).order_by(models.Contact.id)
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
+
+# Умова WHERE для запису в контакт: id, власник, не видалений і, за потреби, очікувана версія (If-Match)
+def _contact_filter(stmt, user_id: int, contact_id: int, expected_version: int | None):
+    stmt = stmt.where(models.Contact.id == contact_id, models.Contact.user_id == user_id, CONTACT_NOT_DELETED)
+    if expected_version is not None:
+        stmt = stmt.where(models.Contact.version == expected_version)
+    return stmt
 
-def get_contacts(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Contact).offset(skip).limit(limit).all()
+# Жоден рядок не змінено: з'ясовуємо причину (лише на цьому рідкісному шляху робиться ще один запит)
+async def _missing_contact(db: AsyncSession, user_id: int, contact_id: int, expected_version: int | None):
+    await db.rollback()
+    if expected_version is not None and await get_contact(db, contact_id, user_id) is not None:
+        raise VersionConflict()
+    return None
 
-def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate):
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id).first()
-    if db_contact:
-        for key, value in contact.model_dump().items():
-            setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
+async def update_contact(db: AsyncSession, user_id: int, contact_id: int, contact: schemas.ContactUpdate,
+                         expected_version: int | None = None):
+    stmt = _contact_filter(update(models.Contact), user_id, contact_id, expected_version)
+    stmt = stmt.values(**contact_values(contact), version=models.Contact.version + 1).returning(models.Contact)
+    try:
+        db_contact = await db.scalar(stmt.execution_options(populate_existing=True))
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_contact_email_conflict(exc):
+            raise ContactEmailExists()
+        raise
+    if db_contact is None:
+        return await _missing_contact(db, user_id, contact_id, expected_version)
+    await db.commit()
+    mark_contacts_changed(user_id)
     return db_contact
 
-def delete_contact(db: Session, contact_id: int):
-    db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id).first()
-    if db_contact:
-        db.delete(db_contact)
-        db.commit()
+# Видалення лише ставить мітку deleted_at, щоб клієнти дізналися про нього під час синхронізації
+def _tombstone_values():
+    now = models.utcnow()
+    return {"deleted_at": now, "updated_at": now, "version": models.Contact.version + 1}
+
+async def delete_contact(db: AsyncSession, user_id: int, contact_id: int, expected_version: int | None = None):
+    stmt = _contact_filter(update(models.Contact), user_id, contact_id, expected_version)
+    stmt = stmt.values(**_tombstone_values()).returning(models.Contact)
+    db_contact = await db.scalar(stmt.execution_options(populate_existing=True))
+    if db_contact is None:
+        return await _missing_contact(db, user_id, contact_id, expected_version)
+    await db.commit()
+    mark_contacts_changed(user_id)
     return db_contact
 
-# Шифрування паролів
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Пакетне часткове оновлення контактів користувача в одній транзакції.
+# Повертає список (id, статус, контакт або None) у порядку елементів запиту.
+async def update_contacts_batch(db: AsyncSession, user_id: int, patches: list[schemas.ContactPatch]):
+    contacts = models.Contact.__table__
+    ids = [patch.id for patch in patches]
+    # Один запит: які контакти належать користувачу, їхні версії та email
+    rows = await db.execute(
+        select(contacts.c.id, contacts.c.version, contacts.c.email)
+        .where(contacts.c.user_id == user_id, contacts.c.id.in_(ids), contacts.c.deleted_at.is_(None))
+        .with_for_update()
+    )
+    current = {row.id: row for row in rows}
+    # Email, які вже зайняті іншими контактами: такі елементи отримують власний статус, а не 400 для всього пакета
+    new_emails = {patch.email for patch in patches if patch.email is not None
+                  and patch.id in current and patch.email != current[patch.id].email}
+    taken = set()
+    if new_emails:
+        taken = set(await db.scalars(
+            select(contacts.c.email).where(contacts.c.email.in_(new_emails), contacts.c.deleted_at.is_(None))
+        ))
+
+    results, groups, expected = {}, {}, {}
+    for patch in patches:
+        row = current.get(patch.id)
+        if row is None:
+            results[patch.id] = ("not_found", None)
+            continue
+        if patch.version is not None and patch.version != row.version:
+            results[patch.id] = ("conflict", None)
+            continue
+        values = patch.model_dump(exclude_unset=True, exclude={"id", "version"})
+        if not values:
+            # Без змінених полів версія не збільшується
+            results[patch.id] = ("unchanged", None)
+            continue
+        email = values.get("email")
+        if email is not None and email != row.email:
+            if email in taken:
+                results[patch.id] = ("email_exists", None)
+                continue
+            taken.add(email)
+        values.update(derived_values(values))
+        results[patch.id] = ("updated", None)
+        expected[patch.id] = row.version
+        # Елементи з однаковим набором полів оновлюються одним executemany
+        groups.setdefault(tuple(sorted(values)), []).append(
+            {"b_id": patch.id, "b_version": row.version, **{f"b_{field}": value for field, value in values.items()}})
+
+    # Версія перевіряється в самому UPDATE: паралельний запис між SELECT і UPDATE не буде перезаписаний.
+    # executemany не повідомляє, які саме рядки збіглися (asyncpg не дає навіть загальної кількості),
+    # тож застосовані рядки впізнаються за міткою updated_at цього пакета і новою версією.
+    written_at = models.utcnow()
+    try:
+        for fields, params in groups.items():
+            stmt = (
+                update(contacts)
+                .where(contacts.c.id == bindparam("b_id"), contacts.c.user_id == user_id,
+                       contacts.c.deleted_at.is_(None), contacts.c.version == bindparam("b_version"))
+                .values({**{field: bindparam(f"b_{field}") for field in fields},
+                         "version": contacts.c.version + 1, "updated_at": written_at})
+            )
+            await db.execute(stmt, params)
+        returned_ids = [contact_id for contact_id, (status, _) in results.items() if status in ("updated", "unchanged")]
+        if returned_ids:
+            returned = await db.scalars(
+                select(models.Contact).where(models.Contact.id.in_(returned_ids))
+                .execution_options(populate_existing=True)
+            )
+            for contact in returned:
+                status = results[contact.id][0]
+                if contact.deleted_at is not None:
+                    results[contact.id] = ("not_found", None)
+                elif status == "updated" and (contact.version != expected[contact.id] + 1
+                                              or contact.updated_at != written_at):
+                    results[contact.id] = ("conflict", None)
+                else:
+                    results[contact.id] = (status, contact)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_contact_email_conflict(exc):
+            raise ContactEmailExists()
+        raise
+    if any(status == "updated" for status, _ in results.values()):
+        mark_contacts_changed(user_id)
+    return [(contact_id, *results[contact_id]) for contact_id in ids]
+
+# Пакетне видалення контактів користувача одним UPDATE ... RETURNING (мітки deleted_at)
+async def delete_contacts_batch(db: AsyncSession, user_id: int, ids: list[int]):
+    stmt = (
+        update(models.Contact)
+        .where(models.Contact.user_id == user_id, models.Contact.id.in_(ids), CONTACT_NOT_DELETED)
+        .values(**_tombstone_values())
+        .returning(models.Contact.id)
+    )
+    deleted = set(await db.scalars(stmt))
+    await db.commit()
+    mark_contacts_changed(user_id)
+    return [(contact_id, "deleted" if contact_id in deleted else "not_found") for contact_id in ids]
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Межі ключів місяць-день для вікна днів народження.
+# Якщо кінець менший за початок, вікно переходить через Новий рік.
+def birthday_window(today: date, days: int):
+    end = today + timedelta(days=days)
+    start_key, end_key = models.birthday_key(today), models.birthday_key(end)
+    # У невисокосний рік народжені 29 лютого святкують 28 лютого
+    if end_key == 228 and not calendar.isleap(end.year):
+        end_key = 229
+    return start_key, end_key
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+# Умова і порядок для днів народження на найближчі дні (щорічно, з урахуванням Нового року)
+def _upcoming_birthdays(query, today: date, days: int):
+    key = models.Contact.birthday_md
+    start_key, end_key = birthday_window(today, days)
+    if days >= 365:
+        query = query.filter(key.is_not(None))
+    elif start_key <= end_key:
+        query = query.filter(key.between(start_key, end_key))
+    else:
+        query = query.filter(or_(key >= start_key, key <= end_key))
+    # Спершу дні народження цього року, потім — після Нового року
+    return query.order_by(case((key >= start_key, 0), else_=1), key, models.Contact.id)
+
+# Контакти користувача з днями народження на найближчі дні
+async def get_upcoming_birthdays(db: AsyncSession, user_id: int, today: date, days: int = 7):
+    query = select(*CONTACT_ROW_COLUMNS).filter(models.Contact.user_id == user_id, CONTACT_NOT_DELETED)
+    result = await db.execute(_upcoming_birthdays(query, today, days))
+    return result.all()
+
+# Найближчі дні народження для пачки користувачів одним запитом (рядки з user_id, згруповані за ним)
+async def get_upcoming_birthdays_for_users(db: AsyncSession, user_ids: list[int], today: date, days: int = 7):
+    query = (
+        select(models.Contact.user_id, *CONTACT_ROW_COLUMNS)
+        .filter(models.Contact.user_id.in_(user_ids), CONTACT_NOT_DELETED)
+        .order_by(models.Contact.user_id)
+    )
+    result = await db.execute(_upcoming_birthdays(query, today, days))
+    return result.all()
+
+# Шифрування паролів (виконується в пулі потоків, а не в циклі подій)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 # Функції CRUD для користувачів
-def create_user(db: Session, user: UserCreate):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
-        return None  # Користувач з таким email вже існує
-    hashed_password = get_password_hash(user.password)
-    new_user = User(email=user.email, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+async def create_user(db: AsyncSession, user: UserCreate):
+    hashed_password = await get_password_hash(user.password)
+    stmt = insert(User).values(email=user.email, hashed_password=hashed_password).returning(User)
+    try:
+        new_user = await db.scalar(stmt)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc, "ix_users_email", "users.email"):
+            return None  # Користувач з таким email вже існує
+        raise
+    user_cache.invalidate(new_user.email)
     return new_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
+    # Перехешування, якщо змінилася кількість раундів bcrypt
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).filter(models.User.id == user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).filter(models.User.email == email))
+
+# Непрозорий курсор для пагінації за ключем (значення ключа останнього запису сторінки)
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
+
+# Контакти користувача впорядковані за id: after_id — пагінація за ключем, skip — зі зсувом
+async def get_contacts_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 10, after_id: int | None = None):
+    query = select(*CONTACT_ROW_COLUMNS).filter(models.Contact.user_id == user_id, CONTACT_NOT_DELETED)
+    if after_id is not None:
+        query = query.filter(models.Contact.id > after_id)
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.order_by(models.Contact.id).limit(limit))
+    return result.all()
+
+# Сторінка контактів і курсор наступної сторінки (None, якщо сторінка остання)
+async def get_contacts_page(db: AsyncSession, user_id: int, limit: int = 10, cursor: str | None = None, skip: int = 0):
+    after_id = None
+    if cursor:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise ValueError("Invalid cursor")
+    # Беремо на один запис більше, щоб дізнатися, чи є наступна сторінка
+    contacts = await get_contacts_by_user(db, user_id, skip=skip, limit=limit + 1, after_id=after_id)
+    next_cursor = None
+    if len(contacts) > limit:
+        contacts = contacts[:limit]
+        next_cursor = encode_cursor({"id": contacts[-1].id})
+    return contacts, next_cursor
+
+# Невидалені контакти користувача з номером у форматі E.164 (один запит за індексом, з кешем)
+async def get_contacts_by_phone(db: AsyncSession, user_id: int, phone_e164: str):
+    key = (user_id, phone_e164)
+    cached = phone_cache.get(key)
+    if cached is not None and cached[0] > contact_writes.get(user_id, 0):
+        return cached[1]
+    read_at = time.monotonic()
+    query = (
+        select(*CONTACT_ROW_COLUMNS)
+        .filter(models.Contact.user_id == user_id, models.Contact.phone_e164 == phone_e164, CONTACT_NOT_DELETED)
+        .order_by(models.Contact.id)
+    )
+    rows = (await db.execute(query)).all()
+    phone_cache.set(key, (read_at, rows))
+    return rows
+
+# Зміни контактів користувача після мітки синхронізації since: (рядки, наступна мітка, чи є ще зміни).
+# Рядки впорядковані за (updated_at, id); видалені мають заповнене deleted_at.
+async def get_contact_changes(db: AsyncSession, user_id: int, since: str | None = None, limit: int = 100):
+    position = decode_cursor(since) if since else {}
+    changed_at, after_id = position.get("t"), position.get("id", 0)
+    if changed_at is not None:
+        try:
+            changed_at = datetime.fromisoformat(changed_at)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    if not isinstance(after_id, int):
+        raise ValueError("Invalid cursor")
+
+    Contact = models.Contact
+    query = (
+        select(*CONTACT_ROW_COLUMNS, Contact.updated_at, Contact.deleted_at)
+        .filter(Contact.user_id == user_id, Contact.updated_at < models.utcnow() - timedelta(seconds=SYNC_SAFETY_LAG_SECONDS))
+    )
+    if changed_at is None:
+        # Перша синхронізація: видалені контакти клієнту не потрібні
+        query = query.filter(CONTACT_NOT_DELETED)
+    else:
+        query = query.filter(tuple_(Contact.updated_at, Contact.id) > tuple_(changed_at, after_id))
+    rows = (await db.execute(query.order_by(Contact.updated_at, Contact.id).limit(limit + 1))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        since = encode_cursor({"t": rows[-1].updated_at.isoformat(), "id": rows[-1].id})
+    return rows, since or encode_cursor({}), has_more
+
+# Пачка активних підтверджених користувачів після after_id (пагінація за ключем id)
+async def get_users_batch(db: AsyncSession, after_id: int = 0, limit: int = 500):
+    query = (
+        select(models.User.id, models.User.email)
+        .filter(models.User.id > after_id, models.User.is_active.is_(True), models.User.is_verified.is_(True))
+        .order_by(models.User.id)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+# Контрольна точка фонового завдання за день: створюється під час першого запуску
+async def get_job_checkpoint(db: AsyncSession, job: str, run_date: date):
+    query = select(models.JobCheckpoint).filter(models.JobCheckpoint.job == job, models.JobCheckpoint.run_date == run_date)
+    checkpoint = await db.scalar(query)
+    if checkpoint is None:
+        checkpoint = models.JobCheckpoint(job=job, run_date=run_date, last_user_id=0, processed=0)
+        db.add(checkpoint)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Інший запуск створив її одночасно
+            await db.rollback()
+            checkpoint = await db.scalar(query)
+    return checkpoint
 
-def get_contacts_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10):
-    return db.query(models.Contact).filter(models.Contact.user_id == user_id).offset(skip).limit(limit).all()
+async def save_job_checkpoint(db: AsyncSession, checkpoint, last_user_id: int, processed: int, completed: bool = False):
+    checkpoint.last_user_id = last_user_id
+    checkpoint.processed = processed
+    checkpoint.updated_at = models.utcnow()
+    if completed:
+        checkpoint.completed_at = checkpoint.updated_at
+    await db.commit()
+    return checkpoint
 
 # Оновлення статусу верифікації користувача
-def verify_user_email(db: Session, email: str):
-    user = db.query(User).filter(User.email == email).first()
+async def verify_user_email(db: AsyncSession, email: str):
+    # Вхід дозволено лише після підтвердження email
+    stmt = update(User).where(User.email == email).values(is_verified=True, is_active=True).returning(User)
+    user = await db.scalar(stmt.execution_options(populate_existing=True))
     if user:
-        user.is_verified = True  # Додаємо поле is_verified у модель User
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        user_cache.invalidate(user.email)
     return user
 
 # Перевірка, чи вже верифікований користувач
-def is_user_verified(db: Session, email: str):
-    user = db.query(User).filter(User.email == email).first()
+async def is_user_verified(db: AsyncSession, email: str):
+    user = await get_user_by_email(db, email)
     if user and user.is_verified:
         return True
     return False
 
 # Оновлення URL аватара користувача
-def update_user_avatar(db: Session, user_id: int, avatar_url: str):
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user_avatar(db: AsyncSession, user_id: int, avatar_url: str, avatar_hash: str | None = None):
+    stmt = update(User).where(User.id == user_id).values(avatar_url=avatar_url, avatar_hash=avatar_hash).returning(User)
+    user = await db.scalar(stmt.execution_options(populate_existing=True))
     if user:
-        user.avatar_url = avatar_url
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        user_cache.invalidate(user.email)
     return user
@@ -1,46 +1,19 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
-from fastapi import BackgroundTasks
-from jinja2 import Environment, FileSystemLoader
+import logging
+from mailer import SENDER_EMAIL, mail_queue, render, build_message, MailQueueFull
 
-def send_verification_email(email: str, username: str, token: str, background_tasks: BackgroundTasks):
-    smtp_server = 'smtp.meta.ua'
-    smtp_port = 587
-    sender_email = os.getenv('SENDER_EMAIL')  # Електронна адреса відправника
-    sender_password = os.getenv('SENDER_PASSWORD')  # Пароль від електронної адреси відправника
+logger = logging.getLogger(__name__)
 
-    if not sender_email or not sender_password:
-        raise ValueError("SENDER_EMAIL or SENDER_PASSWORD is not set in environment variables")
+APP_HOST = "http://localhost:8000/"
 
-    # Завантаження шаблону HTML через Jinja2
-    env = Environment(loader=FileSystemLoader('templates'))  # Шлях до папки з шаблонами
-    template = env.get_template('email_template.html')  # Завантажуємо файл шаблону
+def send_verification_email(email: str, username: str, token: str):
+    if not SENDER_EMAIL:
+        raise ValueError("SENDER_EMAIL is not set in environment variables")
 
-    # Рендеримо шаблон, замінюючи змінні на фактичні значення
-    html_content = template.render(username=username, host="http://localhost:8000/", token=token)
+    # Рендеримо попередньо скомпільований шаблон, замінюючи змінні на фактичні значення
+    html_content = render('email_template.html', username=username, host=APP_HOST, token=token)
 
-    # Підготовка повідомлення
-    subject = "Email Verification"
-    msg = MIMEMultipart()
-    msg['From'] = sender_email
-    msg['To'] = email
-    msg['Subject'] = subject
-
-    # Додаємо HTML-контент у лист
-    msg.attach(MIMEText(html_content, 'html'))
-
-    # Відправка електронного листа
-    def send_email_task():
-        try:
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls()  # Для безпеки
-                server.login(sender_email, sender_password)
-                server.sendmail(sender_email, email, msg.as_string())
-                print(f"Verification email sent to {email}")
-        except Exception as e:
-            print(f"Failed to send email: {e}")
-    
-    # Додаємо завдання у фоновий режим
-    background_tasks.add_task(send_email_task)
+    # Лист надсилає фоновий обробник черги через пул SMTP-з'єднань
+    try:
+        mail_queue.enqueue(build_message(email, "Email Verification", html_content))
+    except MailQueueFull:
+        logger.error("Verification email to %s was not queued: mail queue is full", email)
@@ -0,0 +1,38 @@
+import hashlib
+
+# Сильні ETag для контактів: вміст контакту однозначно визначається парою (id, version)
+
+def contact_etag(contact) -> str:
+    return f'"{contact.id}.{contact.version}"'
+
+def list_etag(contacts, *extra) -> str:
+    digest = hashlib.sha1()
+    for contact in contacts:
+        digest.update(f"{contact.id}.{contact.version};".encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    return f'"{digest.hexdigest()}"'
+
+def _tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """Чи збігається ETag із заголовком If-None-Match (слабке порівняння, RFC 9110)."""
+    if not header:
+        return False
+    for tag in _tags(header):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def expected_version(header: str, contact_id: int):
+    """Версія контакту з If-Match; None для "*". ValueError, якщо тег не стосується цього контакту."""
+    for tag in _tags(header):
+        if tag == "*":
+            return None
+        # If-Match використовує сильне порівняння — слабкі теги не підходять
+        if tag.startswith('"') and tag.endswith('"'):
+            tag_id, _, version = tag[1:-1].partition(".")
+            if tag_id == str(contact_id) and version.isdigit():
+                return int(version)
+    raise ValueError("ETag does not match")
@@ -0,0 +1,38 @@
+# Продакшн-запуск: gunicorn керує кількома процесами uvicorn (gunicorn -c gunicorn.conf.py main:app).
+# Кожен процес створює власний рушій бази даних у lifespan, тобто вже після fork.
+from dotenv import load_dotenv
+import multiprocessing
+import os
+
+load_dotenv()
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Після SIGTERM процес перестає приймати з'єднання і має graceful_timeout секунд, щоб завершити
+# запити та lifespan (відправити чергу листів, закрити пули); потім його буде зупинено примусово
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '60'))
+keepalive = int(os.getenv('KEEPALIVE', '5'))
+
+# Перезапуск процесу після N запитів (0 — вимкнено); jitter, щоб процеси не перезапускалися разом
+max_requests = int(os.getenv('MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', '0'))
+
+accesslog = os.getenv('ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+# Робочі процеси ділять бюджет з'єднань (config.pool_limits) на свою кількість
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+def when_ready(server):
+    rate_limit_enabled = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    if workers > 1 and rate_limit_enabled and not os.getenv('REDIS_URL'):
+        server.log.warning("REDIS_URL is not set: rate limits are counted separately in each of %d workers", workers)
+    phone_cache_ttl = float(os.getenv('PHONE_CACHE_TTL_SECONDS', '5'))
+    if workers > 1 and phone_cache_ttl > 0:
+        server.log.info("Phone lookups may lag contact changes made in other workers by up to %gs", phone_cache_ttl)
+    if workers > 1:
+        server.log.info("/metrics reports the worker that serves the scrape, not the whole server")
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import asyncio
+import os
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+HASHING_MAX_WORKERS = int(os.getenv('HASHING_MAX_WORKERS', str(os.cpu_count() or 1)))
+HASHING_MAX_PENDING = int(os.getenv('HASHING_MAX_PENDING', str(HASHING_MAX_WORKERS * 8)))
+
+class HashingPoolSaturated(Exception):
+    """Черга на хешування паролів переповнена — запит слід повторити пізніше."""
+
+class PasswordHasher:
+    """Хешування паролів bcrypt в обмеженому пулі потоків поза циклом подій.
+
+    bcrypt звільняє GIL, тому потоки справді виконуються паралельно на різних ядрах.
+    Якщо в роботі та в черзі вже max_pending операцій, нові одразу відхиляються.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, max_workers: int = HASHING_MAX_WORKERS,
+                 max_pending: int = HASHING_MAX_PENDING):
+        self.rounds = rounds
+        self._context = None
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    @property
+    def context(self):
+        # passlib і bcrypt завантажуються під час першого хешування, а не під час імпорту
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            self._context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.rounds)
+        return self._context
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingPoolSaturated()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """Повертає (чи збігся пароль, новий хеш або None, якщо змінювати не треба)."""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self):
+        return {"pending": self.pending, "max_pending": self.max_pending,
+                "max_workers": self.max_workers, "rejected": self.rejected}
+
+password_hasher = PasswordHasher()
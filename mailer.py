@@ -0,0 +1,268 @@
+from email.message import EmailMessage
+from dotenv import load_dotenv
+import aiosmtplib
+import asyncio
+import logging
+import os
+import time
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.meta.ua')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_START_TLS = os.getenv('SMTP_START_TLS', 'true').lower() in ('1', 'true', 'yes')
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+SENDER_EMAIL = os.getenv('SENDER_EMAIL')  # Електронна адреса відправника
+SENDER_PASSWORD = os.getenv('SENDER_PASSWORD')  # Пароль від електронної адреси відправника
+
+MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', '2'))  # Кількість постійних SMTP-з'єднань
+MAIL_QUEUE_SIZE = int(os.getenv('MAIL_QUEUE_SIZE', '1000'))
+MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '20'))  # Листів за одне захоплення з'єднання
+MAIL_MAX_RETRIES = int(os.getenv('MAIL_MAX_RETRIES', '3'))
+MAIL_RETRY_BACKOFF = float(os.getenv('MAIL_RETRY_BACKOFF', '1.0'))  # Базова затримка, секунди
+MAIL_RATE_PER_SECOND = float(os.getenv('MAIL_RATE_PER_SECOND', '0'))  # Ліміт листів на секунду, 0 — без ліміту
+MAIL_SUPPRESS_SEND = os.getenv('MAIL_SUPPRESS_SEND', 'false').lower() in ('1', 'true', 'yes')
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+templates = None
+
+def get_templates():
+    """Середовище шаблонів створюється під час першого листа, а не під час старту застосунку."""
+    global templates
+    if templates is None:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+        # Шаблони компілюються один раз: без перевірки змін на диску і без витіснення з кешу
+        templates = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            autoescape=select_autoescape(['html']),
+            auto_reload=False,
+            cache_size=-1,
+        )
+    return templates
+
+def render(template_name: str, **context) -> str:
+    return get_templates().get_template(template_name).render(**context)
+
+def build_message(to: str, subject: str, html_content: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.set_content(html_content, subtype='html')
+    return msg
+
+class SMTPPool:
+    """Пул постійних автентифікованих SMTP-з'єднань."""
+
+    def __init__(self, size: int = MAIL_POOL_SIZE):
+        self.size = size
+        self.opened = 0
+        self._idle = asyncio.LifoQueue()
+        self._slots = None
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(hostname=SMTP_SERVER, port=SMTP_PORT, start_tls=SMTP_START_TLS, timeout=SMTP_TIMEOUT)
+        await smtp.connect()
+        if SENDER_PASSWORD:
+            await smtp.login(SENDER_EMAIL, SENDER_PASSWORD)
+        self.opened += 1
+        return smtp
+
+    async def acquire(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        await self._slots.acquire()
+        try:
+            while not self._idle.empty():
+                smtp = self._idle.get_nowait()
+                if smtp.is_connected:
+                    return smtp
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, smtp, discard: bool = False):
+        if discard or not smtp.is_connected:
+            smtp.close()
+        else:
+            self._idle.put_nowait(smtp)
+        self._slots.release()
+
+    async def close(self):
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+class MailQueueFull(Exception):
+    """Черга листів переповнена."""
+
+class MailQueue:
+    """Обмежена черга листів із пакетним надсиланням, повторами з затримкою і метриками."""
+
+    def __init__(self, pool: SMTPPool, maxsize: int = MAIL_QUEUE_SIZE, batch_size: int = MAIL_BATCH_SIZE,
+                 max_retries: int = MAIL_MAX_RETRIES, backoff: float = MAIL_RETRY_BACKOFF,
+                 rate: float = MAIL_RATE_PER_SECOND, suppress_send: bool = MAIL_SUPPRESS_SEND):
+        self.pool = pool
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate = rate
+        self.suppress_send = suppress_send
+        self._next_send = 0.0
+        self.metrics = {"enqueued": 0, "sent": 0, "failed": 0, "retried": 0, "dropped": 0, "batches": 0}
+        self._queue = None
+        self._workers = []
+        self._retries = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.maxsize)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.pool.size)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Дочікується відправлення листів із черги (не довше timeout) і закриває з'єднання."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Mail queue stopped with %d undelivered messages", self._queue.qsize())
+        for task in [*self._workers, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+        self._workers, self._queue = [], None
+        await self.pool.close()
+
+    async def flush(self):
+        """Чекає, доки всі поставлені листи будуть надіслані або остаточно відхилені."""
+        if self._queue is not None:
+            await self._drain()
+
+    async def _drain(self):
+        # Чекаємо і на чергу, і на листи, що очікують повторної спроби
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.wait(set(self._retries))
+
+    def enqueue(self, message: EmailMessage, attempt: int = 0):
+        if self._queue is None:
+            raise RuntimeError("Mail queue is not started")
+        try:
+            self._queue.put_nowait((message, attempt))
+        except asyncio.QueueFull:
+            self.metrics["dropped"] += 1
+            raise MailQueueFull()
+        if attempt == 0:
+            self.metrics["enqueued"] += 1
+
+    async def put(self, message: EmailMessage):
+        """Як enqueue, але для фонових завдань: чекає на місце в черзі замість MailQueueFull."""
+        if self._queue is None:
+            raise RuntimeError("Mail queue is not started")
+        await self._queue.put((message, 0))
+        self.metrics["enqueued"] += 1
+
+    def stats(self):
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {**self.metrics, "queue_depth": depth, "connections_opened": self.pool.opened}
+
+    def _schedule_retry(self, message: EmailMessage, attempt: int, error: Exception):
+        if attempt >= self.max_retries:
+            self.metrics["failed"] += 1
+            logger.error("Failed to send email to %s after %d attempts: %s", message['To'], attempt + 1, error)
+            return
+        self.metrics["retried"] += 1
+        delay = self.backoff * 2 ** attempt
+
+        async def retry():
+            await asyncio.sleep(delay)
+            try:
+                self.enqueue(message, attempt + 1)
+            except MailQueueFull:
+                self.metrics["failed"] += 1
+                logger.error("Dropped email to %s: mail queue is full", message['To'])
+
+        task = asyncio.create_task(retry())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _throttle(self):
+        # Спільний для всіх обробників темп: не частіше за rate листів на секунду
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_send)
+        self._next_send = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send_batch(batch)
+            except Exception:
+                # Непередбачена помилка не повинна зупиняти обробник: інакше черга перестане спорожнятися
+                self.metrics["failed"] += len(batch)
+                logger.exception("Unexpected error while sending a batch of %d emails", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send_batch(self, batch):
+        self.metrics["batches"] += 1
+        if self.suppress_send:
+            for _ in batch:
+                await self._throttle()
+                self.metrics["sent"] += 1
+            return
+        try:
+            smtp = await self.pool.acquire()
+        except (aiosmtplib.SMTPException, OSError) as error:
+            for message, attempt in batch:
+                self._schedule_retry(message, attempt, error)
+            return
+        broken = False
+        try:
+            for message, attempt in batch:
+                if broken:
+                    # З'єднання втрачено — решту пачки повертаємо в чергу без затримки
+                    self._requeue(message, attempt)
+                    continue
+                try:
+                    await self._throttle()
+                    await smtp.send_message(message)
+                    self.metrics["sent"] += 1
+                except aiosmtplib.SMTPRecipientsRefused as error:
+                    self.metrics["failed"] += 1
+                    logger.error("Recipient refused for %s: %s", message['To'], error)
+                except (aiosmtplib.SMTPException, OSError) as error:
+                    broken = not smtp.is_connected or isinstance(error, (aiosmtplib.SMTPServerDisconnected, OSError))
+                    self._schedule_retry(message, attempt, error)
+        except BaseException:
+            # Стан з'єднання після непередбаченої помилки невідомий — не повертаємо його в пул
+            broken = True
+            raise
+        finally:
+            self.pool.release(smtp, discard=broken)
+
+    def _requeue(self, message: EmailMessage, attempt: int):
+        try:
+            self._queue.put_nowait((message, attempt))
+        except asyncio.QueueFull:
+            self.metrics["failed"] += 1
+            logger.error("Dropped email to %s: mail queue is full", message['To'])
+
+mail_queue = MailQueue(SMTPPool())
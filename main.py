@@ -1,18 +1,45 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Query, Request, Response, Header
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_ratelimiter import FastAPIRateLimiter
-import crud, models, schemas, auth
-from config import engine, get_db
-from datetime import datetime, timedelta
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, PlainTextResponse
+import crud, schemas, auth, search, contact_io, etags
+from avatars import avatar_pipeline, InvalidAvatar, AvatarTooLarge
+import config
+from config import get_db, get_read_db, BIRTHDAY_WINDOW_DAYS
+from cache import user_cache
+from hashing import password_hasher, HashingPoolSaturated
+from datetime import datetime
 from email_utils import send_verification_email
+from mailer import mail_queue
+from phones import normalize_phone
+from ratelimit import limiter
+import metrics
 from token_utils import create_email_verification_token, verify_email_token
-from cloudinary import uploader
+
+# Підключення до бази даних під час старту застосунку; схема створюється міграціями (alembic upgrade head)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine = config.init_engine()
+    for db_engine in (engine, *config.replicas.engines):
+        metrics.instrument_engine(db_engine)
+    if config.DB_SCHEMA_CHECK:
+        await config.check_schema_revision(engine)
+    await config.warm_pool(engine)
+    await config.replicas.check()
+    config.replicas.start()
+    await mail_queue.start()
+    yield
+    await mail_queue.stop()
+    await limiter.close()
+    avatar_pipeline.shutdown()
+    password_hasher.shutdown()
+    await config.dispose_engine()
 
 # Налаштування CORS
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 origins = ["*"]
 
 app.add_middleware(
@@ -23,105 +50,244 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ініціалізація FastAPI Rate Limiter
-FastAPIRateLimiter.init(app)
+# Час обробки маршрутів і кількість SQL-запитів
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.registry.register_collector(metrics.pool_collector(lambda: config.engine))
+metrics.registry.register_collector(metrics.stats_collector("db_replicas", "Read replicas", config.replicas.stats))
+metrics.registry.register_collector(metrics.stats_collector("user_cache", "User principal cache", user_cache.stats))
+metrics.registry.register_collector(metrics.stats_collector("token_cache", "Verified JWT cache", auth.token_cache.stats))
+metrics.registry.register_collector(metrics.stats_collector("phone_cache", "Phone lookup cache", crud.phone_cache.stats))
+metrics.registry.register_collector(metrics.stats_collector("rate_limiter", "Rate limiter", limiter.stats))
+metrics.registry.register_collector(metrics.stats_collector("password_hasher", "Password hashing pool", password_hasher.stats))
+metrics.registry.register_collector(metrics.stats_collector("mail_queue", "Mail delivery queue", mail_queue.stats))
 
-# Ініціалізація бази даних
-models.Base.metadata.create_all(bind=engine)
+# Швидка відмова, коли пул хешування паролів перевантажений
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_pool_saturated_handler(request, exc):
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={"detail": "Server is busy, please retry"},
+                        headers={"Retry-After": "1"})
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Функція для отримання користувача з токена
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Функція для отримання користувача з токена (спершу з кешу, щоб не звертатися до БД)
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     email = auth.verify_token(token, HTTPException(status_code=401, detail="Invalid token"))
-    user = crud.get_user_by_email(db, email)
-    if not user:
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    db_user = await crud.get_user_by_email(db, email)
+    if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    user = schemas.User.model_validate(db_user)
+    user_cache.set(email, user)
     return user
 
+# Відповідь для контакту, якого немає: If-Match: * вимагає наявного контакту, тому 412 (RFC 9110, 13.1.1)
+def missing_contact_error(if_match: str | None, expected_version: int | None):
+    if if_match is not None and expected_version is None:
+        return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact does not exist")
+    return HTTPException(status_code=404, detail="Contact not found")
+
+# Очікувана версія контакту із заголовка If-Match (оптимістичне блокування)
+def if_match_version(if_match: str | None, contact_id: int):
+    if if_match is None:
+        return None
+    try:
+        return etags.expected_version(if_match, contact_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact was modified")
+
+# Швидка відповідь зі списком контактів: рядки серіалізуються напряму, без повторної валідації
+# через ContactInDB. Результат побайтово збігається зі стандартною JSON-відповіддю FastAPI.
+# Заголовки, виставлені залежностями (наприклад, X-RateLimit-Limit), переносяться з response.
+def contact_list_response(rows, response: Response, headers=None):
+    content = [dict(zip(crud.CONTACT_ROW_FIELDS, row)) for row in rows]
+    return ORJSONResponse(content, headers={**response.headers, **(headers or {})})
+
 # Функція для оновлення аватара
-@app.post("/users/me/avatar")
-@FastAPIRateLimiter.limit("10/minute")
-async def update_avatar(file: UploadFile = File(...), user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    result = uploader.upload(file.file, folder="avatars")
-    user.avatar_url = result['secure_url']
-    db.commit()
-    
-    return {"msg": "Avatar updated successfully", "avatar_url": user.avatar_url}
+@app.post("/users/me/avatar", dependencies=[Depends(limiter.limit("10/minute"))])
+async def update_avatar(file: UploadFile = File(...), user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user(db, user.id)
+    # Користувач із кешу автентифікації міг бути видалений
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        result = await avatar_pipeline.save(user.id, file, current_hash=db_user.avatar_hash)
+    except AvatarTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar file is too large")
+    except InvalidAvatar:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid image")
+
+    # Той самий файл уже завантажено раніше
+    if result.unchanged:
+        return {"msg": "Avatar is unchanged", "avatar_url": db_user.avatar_url}
+
+    db_user = await crud.update_user_avatar(db, user.id, result.url, result.content_hash)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"msg": "Avatar updated successfully", "avatar_url": db_user.avatar_url, "sizes": result.urls}
 
 # Маршрут для створення контакту
-@app.post("/contacts/", response_model=schemas.ContactInDB)
-@FastAPIRateLimiter.limit("10/minute")
-async def create_contact(contact: schemas.ContactCreate, db: Session = Depends(get_db)):
-    return crud.create_contact(db, contact)
+@app.post("/contacts/", response_model=schemas.ContactInDB, dependencies=[Depends(limiter.limit("10/minute"))])
+async def create_contact(contact: schemas.ContactCreate, user: schemas.User = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
+    try:
+        return await crud.create_contact(db, user.id, contact)
+    except crud.ContactEmailExists:
+        raise HTTPException(status_code=400, detail="Contact with this email already exists")
+
+# Імпорт контактів із файлу CSV або NDJSON
+@app.post("/contacts/import", response_model=schemas.ContactImportResult, dependencies=[Depends(limiter.limit("10/minute"))])
+async def import_contacts(file: UploadFile = File(...), format: str | None = Query(None, pattern="^(csv|ndjson)$"),
+                          user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    fmt = format or contact_io.detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unsupported file format, use CSV or NDJSON")
+    try:
+        return await contact_io.import_contacts(db, user.id, file.file, fmt)
+    except contact_io.ImportFileError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded CSV or NDJSON")
+
+# Експорт контактів користувача
+@app.get("/contacts/export", dependencies=[Depends(limiter.limit("10/minute"))])
+async def export_contacts(request: Request, format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+                          user: schemas.User = Depends(get_current_user)):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        contact_io.export_contacts(user.id, format, config.sticky_key(request)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+# Пакетне часткове оновлення контактів (одна транзакція, результат для кожного елемента)
+@app.patch("/contacts/batch", response_model=List[schemas.ContactBatchItemResult], dependencies=[Depends(limiter.limit("10/minute"))])
+async def update_contacts_batch(batch: schemas.ContactBatchUpdate, user: schemas.User = Depends(get_current_user),
+                                db: AsyncSession = Depends(get_db)):
+    try:
+        results = await crud.update_contacts_batch(db, user.id, batch.items)
+    except crud.ContactEmailExists:
+        # Зайняті email позначаються в результатах; сюди доходить лише email, зайнятий паралельним записом
+        raise HTTPException(status_code=400, detail="Contact with this email already exists")
+    return [{"id": contact_id, "status": result, "contact": contact} for contact_id, result, contact in results]
+
+# Пакетне видалення контактів
+@app.post("/contacts/batch-delete", response_model=List[schemas.ContactBatchItemResult], dependencies=[Depends(limiter.limit("10/minute"))])
+async def delete_contacts_batch(batch: schemas.ContactBatchDelete, user: schemas.User = Depends(get_current_user),
+                                db: AsyncSession = Depends(get_db)):
+    results = await crud.delete_contacts_batch(db, user.id, list(dict.fromkeys(batch.ids)))
+    return [{"id": contact_id, "status": result} for contact_id, result in results]
+
+# Зміни контактів з моменту попередньої синхронізації (since — next_token з попередньої відповіді)
+@app.get("/contacts/changes", response_model=schemas.ContactChanges, dependencies=[Depends(limiter.limit("10/minute"))])
+async def contact_changes(response: Response, since: str | None = None, limit: int = Query(100, ge=1, le=1000),
+                          user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    try:
+        rows, next_token, has_more = await crud.get_contact_changes(db, user.id, since=since, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    content = {
+        "upserts": [dict(zip(crud.CONTACT_ROW_FIELDS, row)) for row in rows if row.deleted_at is None],
+        "deleted": [row.id for row in rows if row.deleted_at is not None],
+        "next_token": next_token,
+        "has_more": has_more,
+    }
+    return ORJSONResponse(content, headers=dict(response.headers))
+
+# Контакти користувача з указаним номером телефону (будь-який формат запису номера)
+@app.get("/contacts/by-phone/{number}", response_model=List[schemas.ContactInDB], dependencies=[Depends(limiter.limit("10/minute"))])
+async def contacts_by_phone(number: str, response: Response, user: schemas.User = Depends(get_current_user),
+                            db: AsyncSession = Depends(get_read_db)):
+    phone_e164 = normalize_phone(number)
+    if phone_e164 is None:
+        raise HTTPException(status_code=400, detail="Invalid phone number")
+    return contact_list_response(await crud.get_contacts_by_phone(db, user.id, phone_e164), response)
 
 # Отримання одного контакту за ID
-@app.get("/contacts/{contact_id}", response_model=schemas.ContactInDB)
-@FastAPIRateLimiter.limit("10/minute")
-async def read_contact(contact_id: int, db: Session = Depends(get_db)):
-    db_contact = crud.get_contact(db, contact_id)
+@app.get("/contacts/{contact_id}", response_model=schemas.ContactInDB, dependencies=[Depends(limiter.limit("10/minute"))])
+async def read_contact(contact_id: int, response: Response, if_none_match: str | None = Header(None),
+                       user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    db_contact = await crud.get_contact(db, contact_id, user.id)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
+    etag = etags.contact_etag(db_contact)
+    # Клієнт уже має актуальну версію — відповідаємо без тіла
+    if etags.if_none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**response.headers, "ETag": etag})
+    response.headers["ETag"] = etag
     return db_contact
 
-# Отримання контактів користувача (з аутентифікацією)
-@app.get("/contacts/", response_model=List[schemas.ContactInDB])
-@FastAPIRateLimiter.limit("10/minute")
-async def read_contacts(skip: int = 0, limit: int = 10, user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return crud.get_contacts_by_user(db, user_id=user.id, skip=skip, limit=limit)
+# Отримання контактів користувача (з аутентифікацією).
+# Курсор наступної сторінки повертається в заголовку X-Next-Cursor; skip лишено для сумісності.
+@app.get("/contacts/", response_model=List[schemas.ContactInDB], dependencies=[Depends(limiter.limit("10/minute"))])
+async def read_contacts(response: Response, skip: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100),
+                        cursor: str | None = None, if_none_match: str | None = Header(None),
+                        user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    try:
+        contacts, next_cursor = await crud.get_contacts_page(db, user.id, limit=limit, cursor=cursor, skip=skip)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    etag = etags.list_etag(contacts, next_cursor)
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etags.if_none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**response.headers, **headers})
+    return contact_list_response(contacts, response, headers)
 
 # Оновлення контакту
-@app.put("/contacts/{contact_id}", response_model=schemas.ContactInDB)
-@FastAPIRateLimiter.limit("10/minute")
-async def update_contact(contact_id: int, contact: schemas.ContactUpdate, db: Session = Depends(get_db)):
-    db_contact = crud.update_contact(db, contact_id, contact)
+@app.put("/contacts/{contact_id}", response_model=schemas.ContactInDB, dependencies=[Depends(limiter.limit("10/minute"))])
+async def update_contact(contact_id: int, contact: schemas.ContactUpdate, response: Response,
+                         if_match: str | None = Header(None), user: schemas.User = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
+    expected_version = if_match_version(if_match, contact_id)
+    try:
+        db_contact = await crud.update_contact(db, user.id, contact_id, contact, expected_version=expected_version)
+    except crud.VersionConflict:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact was modified")
+    except crud.ContactEmailExists:
+        raise HTTPException(status_code=400, detail="Contact with this email already exists")
     if db_contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
+        raise missing_contact_error(if_match, expected_version)
+    response.headers["ETag"] = etags.contact_etag(db_contact)
     return db_contact
 
 # Видалення контакту
-@app.delete("/contacts/{contact_id}", response_model=schemas.ContactInDB)
-@FastAPIRateLimiter.limit("10/minute")
-async def delete_contact(contact_id: int, db: Session = Depends(get_db)):
-    db_contact = crud.delete_contact(db, contact_id)
+@app.delete("/contacts/{contact_id}", response_model=schemas.ContactInDB, dependencies=[Depends(limiter.limit("10/minute"))])
+async def delete_contact(contact_id: int, if_match: str | None = Header(None),
+                         user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    expected_version = if_match_version(if_match, contact_id)
+    try:
+        db_contact = await crud.delete_contact(db, user.id, contact_id, expected_version=expected_version)
+    except crud.VersionConflict:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact was modified")
     if db_contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
+        raise missing_contact_error(if_match, expected_version)
     return db_contact
 
-# Пошук контактів
-@app.get("/contacts/search/", response_model=List[schemas.ContactInDB])
-@FastAPIRateLimiter.limit("10/minute")
-async def search_contacts(query: str, db: Session = Depends(get_db)):
-    contacts = db.query(models.Contact).filter(
-        (models.Contact.first_name.ilike(f"%{query}%")) |
-        (models.Contact.last_name.ilike(f"%{query}%")) |
-        (models.Contact.email.ilike(f"%{query}%"))
-    ).all()
-    return contacts
-
-# Отримання контактів з найближчими днями народження
-@app.get("/contacts/upcoming-birthdays/", response_model=List[schemas.ContactInDB])
-@FastAPIRateLimiter.limit("10/minute")
-async def upcoming_birthdays(db: Session = Depends(get_db)):
+# Пошук контактів користувача (ранжований, з пагінацією)
+@app.get("/contacts/search/", response_model=List[schemas.ContactInDB], dependencies=[Depends(limiter.limit("10/minute"))])
+async def search_contacts(query: str, response: Response, skip: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100),
+                          user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+    return contact_list_response(await search.search_contacts(db, user.id, query, skip=skip, limit=limit), response)
+
+# Отримання контактів користувача з найближчими днями народження
+@app.get("/contacts/upcoming-birthdays/", response_model=List[schemas.ContactInDB], dependencies=[Depends(limiter.limit("10/minute"))])
+async def upcoming_birthdays(response: Response, days: int = Query(BIRTHDAY_WINDOW_DAYS, ge=0, le=366),
+                             user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     today = datetime.now().date()
-    upcoming = today + timedelta(days=7)
-    contacts = db.query(models.Contact).filter(
-        models.Contact.birthday.between(today, upcoming)
-    ).all()
-    return contacts
+    return contact_list_response(await crud.get_upcoming_birthdays(db, user.id, today, days=days), response)
 
 # Реєстрація користувача з верифікацією email
-@app.post("/register", response_model=schemas.User)
-@FastAPIRateLimiter.limit("10/minute")
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db), background_tasks: BackgroundTasks = None):
-    db_user = crud.get_user_by_email(db, user.email)
-    if db_user:
+@app.post("/register", response_model=schemas.User, dependencies=[Depends(limiter.limit("10/minute"))])
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    # Унікальність email перевіряє обмеження бази даних
+    db_user = await crud.create_user(db, user)
+    if db_user is None:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user = crud.create_user(db, user)
-    
     token = create_email_verification_token(db_user.email)
-    send_verification_email(db_user.email, db_user.email.split('@')[0], token, background_tasks)
+    send_verification_email(db_user.email, db_user.email.split('@')[0], token)
     
     return {
         "id": db_user.id,
@@ -131,27 +297,22 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db), back
     }
 
 # Верифікація email
-@app.get("/verify-email")
-@FastAPIRateLimiter.limit("10/minute")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+@app.get("/verify-email", dependencies=[Depends(limiter.limit("10/minute"))])
+async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
     email = verify_email_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    db_user = crud.get_user_by_email(db, email)
+    db_user = await crud.verify_user_email(db, email)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    db_user.is_active = True
-    db.commit()
-    
     return {"msg": "Email verified successfully"}
 
 # Вхід і отримання токену
-@app.post("/token", response_model=schemas.Token)
-@FastAPIRateLimiter.limit("10/minute")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+@app.post("/token", response_model=schemas.Token, dependencies=[Depends(limiter.limit("10/minute"))])
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
     
@@ -160,3 +321,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     access_token = auth.create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
+
+# Метрики у текстовому форматі Prometheus
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
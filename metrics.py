@@ -0,0 +1,226 @@
+from collections import Counter as _Tally
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from sqlalchemy import event
+from bisect import bisect_left
+import logging
+import os
+import random
+import time
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Частка запитів, для яких рахуються SQL-запити (таймінг HTTP рахується для всіх)
+METRICS_SQL_SAMPLE_RATE = float(os.getenv('METRICS_SQL_SAMPLE_RATE', '0.1'))
+METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', '200'))
+# Скільки разів однаковий запит має виконатися за один HTTP-запит, щоб вважатися N+1
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv('METRICS_N_PLUS_ONE_THRESHOLD', '10'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # мітки -> [лічильники кошиків..., сума, кількість]
+
+    def observe(self, value, *label_values):
+        state = self._values.get(label_values)
+        if state is None:
+            state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), state):
+                cumulative += count
+                labels = _format_labels((*self.labels, "le"), (*label_values, bound))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """collect() повертає список (назва, тип, опис, {кортеж міток: значення}, назви міток)."""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, kind, help, samples, label_names in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for label_values, value in samples.items():
+                    lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+db_queries_per_request = registry.histogram("db_queries_per_request", "SQL statements per sampled HTTP request",
+                                            ("route",), QUERY_COUNT_BUCKETS)
+db_query_duration = registry.histogram("db_query_duration_seconds", "SQL statement latency in sampled requests",
+                                       ("route",))
+db_slow_queries = registry.counter("db_slow_queries_total", "SQL statements slower than METRICS_SLOW_QUERY_MS",
+                                   ("route",))
+db_n_plus_one = registry.counter("db_n_plus_one_total", "Sampled requests repeating one statement N+1 style",
+                                 ("route",))
+
+class RequestStats:
+    __slots__ = ("queries", "durations", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = []
+        self.statements = _Tally()
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    stats.queries += 1
+    stats.durations.append(time.perf_counter() - starts.pop())
+    stats.statements[statement] += 1
+
+def instrument_engine(engine):
+    """Підключає лічильники SQL до рушія (AsyncEngine або звичайного)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def _route_name(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _record_sql(route: str, stats: RequestStats):
+    db_queries_per_request.observe(stats.queries, route)
+    slow_threshold = METRICS_SLOW_QUERY_MS / 1000
+    for duration in stats.durations:
+        db_query_duration.observe(duration, route)
+        if duration >= slow_threshold:
+            db_slow_queries.inc(route)
+    if stats.statements:
+        statement, repeats = stats.statements.most_common(1)[0]
+        if repeats >= METRICS_N_PLUS_ONE_THRESHOLD:
+            db_n_plus_one.inc(route)
+            logger.warning("Possible N+1 on %s: statement executed %d times: %s", route, repeats, statement[:200])
+
+class MetricsMiddleware:
+    """ASGI-проміжний шар: час обробки кожного маршруту і SQL-статистика для частини запитів."""
+
+    def __init__(self, app, sample_rate: float = METRICS_SQL_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats() if random.random() < self.sample_rate else None
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = _route_name(scope)
+            http_requests.inc(scope["method"], route, status_code)
+            http_duration.observe(elapsed, scope["method"], route)
+            if stats is not None:
+                _record_sql(route, stats)
+
+def pool_collector(get_engine):
+    """Показники пулу з'єднань під час кожного зчитування /metrics (рушій береться ліниво)."""
+    def collect():
+        engine = get_engine()
+        if engine is None:
+            return []
+        pool = getattr(engine, "sync_engine", engine).pool
+        samples = []
+        for name, method, help in (
+            ("db_pool_size", "size", "Configured connection pool size"),
+            ("db_pool_checked_out", "checkedout", "Connections currently checked out"),
+            ("db_pool_checked_in", "checkedin", "Idle connections in the pool"),
+            ("db_pool_overflow", "overflow", "Connections opened beyond the pool size"),
+        ):
+            if hasattr(pool, method):
+                samples.append((name, "gauge", help, {(): getattr(pool, method)()}, ()))
+        return samples
+    return collect
+
+def stats_collector(prefix: str, help: str, stats):
+    """Перетворює словник stats() (кешів, лімітера, пошти тощо) на метрики з префіксом."""
+    def collect():
+        return [(f"{prefix}_{key}", "gauge", f"{help}: {key}", {(): value}, ())
+                for key, value in stats().items() if isinstance(value, (int, float))]
+    return collect
@@ -1,17 +1,61 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, Boolean, ForeignKey, Index, UniqueConstraint, DDL, event, literal_column, text
 from sqlalchemy.orm import relationship
 from config import Base
+from datetime import date, datetime, timezone
+
+# Вираз tsvector для повнотекстового пошуку контактів (PostgreSQL).
+# Запит і індекс мають використовувати однаковий вираз, інакше індекс не спрацює.
+CONTACT_SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || "
+    "coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+)
+
+def birthday_key(value: date) -> int:
+    """Ключ дня народження у форматі місяць*100 + день (наприклад, 1231 для 31 грудня)."""
+    return value.month * 100 + value.day
+
+def utcnow() -> datetime:
+    """Поточний час UTC без часової зони (так зберігаються мітки часу контактів)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Триграмні GIN-індекси обслуговують ILIKE '%query%' у PostgreSQL
+        Index("ix_contacts_first_name_trgm", "first_name", postgresql_using="gin",
+              postgresql_ops={"first_name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_contacts_last_name_trgm", "last_name", postgresql_using="gin",
+              postgresql_ops={"last_name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_contacts_email_trgm", "email", postgresql_using="gin",
+              postgresql_ops={"email": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_contacts_search_tsv", literal_column(CONTACT_SEARCH_VECTOR),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+        # Стабільна пагінація контактів користувача за ключем (user_id, id)
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        # Діапазонний пошук найближчих днів народження в межах користувача
+        Index("ix_contacts_user_id_birthday_md", "user_id", "birthday_md"),
+        # Синхронізація змін: контакти користувача, змінені після мітки (updated_at, id)
+        Index("ix_contacts_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        # Пошук контакту за вхідним дзвінком (номер у форматі E.164)
+        Index("ix_contacts_user_id_phone_e164", "user_id", "phone_e164"),
+        # Email унікальний лише серед невидалених контактів
+        Index("ix_contacts_email", "email", unique=True,
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True)
     last_name = Column(String, index=True)
-    email = Column(String, index=True, unique=True)
+    email = Column(String)
     phone_number = Column(String, index=True)
+    phone_e164 = Column(String(16), nullable=True)  # Нормалізований номер (phones.normalize_phone)
     birthday = Column(Date)
+    birthday_md = Column(SmallInteger, nullable=True)  # Місяць і день народження (див. birthday_key)
     additional_info = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Збільшується з кожною зміною (ETag)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)  # Змінюється з кожним записом, зокрема видаленням
+    deleted_at = Column(DateTime, nullable=True)  # Мітка видалення: рядок лишається для синхронізації клієнтів
     
     # Зовнішній ключ для зв’язування контактів із користувачем
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -28,6 +72,46 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)  # Поле для статусу верифікації
     avatar_url = Column(String, nullable=True)  # Поле для зберігання URL аватара
+    avatar_hash = Column(String(64), nullable=True)  # SHA-256 вмісту завантаженого аватара
 
     # Відношення до моделі Contact
     contacts = relationship("Contact", back_populates="user")
+
+# Прогрес фонових завдань (розсилок): після перезапуску завдання продовжує з last_user_id
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    __table_args__ = (UniqueConstraint("job", "run_date", name="uq_job_checkpoints_job_run_date"),)
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String(64), nullable=False)
+    run_date = Column(Date, nullable=False)  # День, за який виконується завдання
+    last_user_id = Column(Integer, nullable=False, default=0)  # Останній повністю оброблений користувач
+    processed = Column(Integer, nullable=False, default=0)  # Скільки листів уже поставлено на відправлення
+    updated_at = Column(DateTime, default=utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+# Розширення pg_trgm потрібне для триграмних індексів
+event.listen(
+    Contact.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# Запасний варіант для SQLite: таблиця FTS5 із зовнішнім вмістом і тригери синхронізації
+SQLITE_CONTACT_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+    "first_name, last_name, email, content='contacts', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); END",
+]
+
+for statement in SQLITE_CONTACT_FTS_DDL:
+    event.listen(Contact.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,38 @@
+from dotenv import load_dotenv
+import os
+import re
+
+load_dotenv()
+
+# Код країни для номерів, записаних у національному форматі (0671234567 -> +380671234567)
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '380').lstrip('+')
+# Префікс виходу на міжнародну лінію (00380... -> +380...)
+PHONE_INTERNATIONAL_PREFIX = os.getenv('PHONE_INTERNATIONAL_PREFIX', '00')
+
+# Внутрішній номер: "067 123 45 67 ext. 12", "0671234567 x12", "0671234567#12"
+_EXTENSION_RE = re.compile(r"(?:ext\.?|доб\.?|x|#).*$", re.IGNORECASE)
+_NON_DIGITS_RE = re.compile(r"\D")
+
+def normalize_phone(value: str | None, country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> str | None:
+    """Номер у форматі E.164 (+380671234567) або None, якщо його не вдається розпізнати."""
+    if not value:
+        return None
+    value = _EXTENSION_RE.sub("", value).strip()
+    digits = _NON_DIGITS_RE.sub("", value)
+    if not digits:
+        return None
+
+    if value.startswith("+"):
+        pass
+    elif PHONE_INTERNATIONAL_PREFIX and digits.startswith(PHONE_INTERNATIONAL_PREFIX):
+        digits = digits[len(PHONE_INTERNATIONAL_PREFIX):]
+    elif digits.startswith("0"):
+        # Національний формат: перша 0 — префікс міжміського зв'язку
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code):
+        digits = country_code + digits
+
+    # E.164: до 15 цифр разом із кодом країни; коротші за 8 — не номер абонента
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return "+" + digits
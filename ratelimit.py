@@ -0,0 +1,219 @@
+from fastapi import HTTPException, Request, Response, status
+from dotenv import load_dotenv
+from dataclasses import dataclass
+import auth
+import json
+import logging
+import math
+import os
+import time
+from cache import TTLCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+REDIS_URL = os.getenv('REDIS_URL')  # Без Redis ліміти рахуються в межах одного процесу
+# Ліміти для окремих маршрутів, напр. {"POST /token": "5/minute"}
+RATE_LIMITS = json.loads(os.getenv('RATE_LIMITS', '{}'))
+# Ліміти для окремих користувачів на всі маршрути, напр. {"admin@example.com": "1000/minute"}
+RATE_LIMIT_USERS = json.loads(os.getenv('RATE_LIMIT_USERS', '{}'))
+# Частка ліміту, яку процес бере «в оренду», щоб не звертатися до Redis на кожен запит
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv('RATE_LIMIT_LEASE_FRACTION', '0.1'))
+RATE_LIMIT_LEASE_TTL = float(os.getenv('RATE_LIMIT_LEASE_TTL', '1.0'))  # секунди
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rate(rate: str):
+    """'10/minute' -> (10, 60)."""
+    count, _, period = rate.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in PERIODS:
+        raise ValueError(f"Unknown rate period: {rate}")
+    return int(count), PERIODS[period]
+
+# GCRA: у ключі зберігається теоретичний час прибуття (TAT) наступного запиту.
+# Скрипт видає до ARGV[3] токенів одразу, але лише коли клієнт далеко від ліміту.
+# ARGV[4] — невикористані токени простроченої оренди, що повертаються перед видачею нових.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4]) or 0
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tat = (tonumber(redis.call('GET', KEYS[1])) or now) - refund * emission
+if tat < now then tat = now end
+local available = math.floor((now + emission * burst - tat) / emission)
+if available < 1 then
+    if refund > 0 then
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+    end
+    return {0, math.ceil(tat + emission - emission * burst - now)}
+end
+local granted = 1
+if available >= requested * 2 then granted = requested end
+tat = tat + granted * emission
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+return {granted, 0}
+"""
+
+class MemoryBackend:
+    """GCRA у пам'яті процесу (без Redis, для одного воркера і тестів)."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._tat = TTLCache(max_keys, ttl=max(PERIODS.values()))
+
+    async def acquire(self, key: str, limit: int, period: int, requested: int, refund: int = 0):
+        emission = period * 1000 / limit
+        now = time.monotonic() * 1000
+        tat = max(self._tat.get(key, now) - refund * emission, now)
+        available = math.floor((now + emission * limit - tat) / emission)
+        if available < 1:
+            if refund:
+                self._tat.set(key, tat)
+            return 0, math.ceil(tat + emission - emission * limit - now)
+        granted = requested if available >= requested * 2 else 1
+        self._tat.set(key, tat + granted * emission)
+        return granted, 0
+
+    async def close(self):
+        pass
+
+class RedisBackend:
+    """Спільний для всіх воркерів GCRA в атомарному Lua-скрипті Redis."""
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str):
+        from redis import asyncio as aioredis
+
+        return cls(aioredis.from_url(url))
+
+    async def acquire(self, key: str, limit: int, period: int, requested: int, refund: int = 0):
+        granted, retry_after_ms = await self._script(keys=[key], args=[period * 1000 / limit, limit, requested, refund])
+        return int(granted), int(retry_after_ms)
+
+    async def close(self):
+        await self.client.aclose()
+
+@dataclass
+class Lease:
+    tokens: int
+    expires_at: float
+
+class RateLimiter:
+    """Обмеження частоти запитів із локальним швидким шляхом.
+
+    Коли клієнт далеко від ліміту, процес отримує з бекенду одразу кілька токенів
+    (оренду) і витрачає їх без звернення до Redis. Біля межі ліміту оренда зменшується
+    до одного токена, тож кожен запит перевіряється бекендом. Оренда діє
+    RATE_LIMIT_LEASE_TTL секунд; її невикористані токени повертаються бекенду
+    під час наступного звернення за цим ключем.
+    """
+
+    def __init__(self, backend=None, lease_fraction: float = RATE_LIMIT_LEASE_FRACTION,
+                 lease_ttl: float = RATE_LIMIT_LEASE_TTL, enabled: bool = RATE_LIMIT_ENABLED):
+        self.backend = backend
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.enabled = enabled
+        self._leases = TTLCache(RATE_LIMIT_MAX_KEYS, ttl=lease_ttl)
+        self.metrics = {"allowed": 0, "limited": 0, "local_hits": 0, "backend_calls": 0, "backend_errors": 0,
+                        "refunded": 0}
+
+    def _get_backend(self):
+        if self.backend is None:
+            self.backend = RedisBackend.from_url(REDIS_URL) if REDIS_URL else MemoryBackend()
+        return self.backend
+
+    async def hit(self, key: str, limit: int, period: int):
+        """Повертає (дозволено, секунд до повтору)."""
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            self.metrics["local_hits"] += 1
+            self.metrics["allowed"] += 1
+            return True, 0
+
+        # Прострочена оренда з токенами: повертаємо їх тим самим викликом бекенду
+        refund = lease.tokens if lease is not None else 0
+        if lease is not None:
+            self._leases.invalidate(key)
+        requested = max(1, int(limit * self.lease_fraction))
+        self.metrics["backend_calls"] += 1
+        try:
+            granted, retry_after_ms = await self._get_backend().acquire(key, limit, period, requested, refund)
+            self.metrics["refunded"] += refund
+        except Exception as exc:
+            # Недоступний Redis не повинен зупиняти сервіс
+            self.metrics["backend_errors"] += 1
+            logger.warning("Rate limit backend error, allowing request: %s", exc)
+            self.metrics["allowed"] += 1
+            return True, 0
+        if not granted:
+            self.metrics["limited"] += 1
+            return False, max(1, math.ceil(retry_after_ms / 1000))
+        if granted > 1:
+            # Запис живе довше за оренду, щоб її залишок можна було повернути (після period він уже не важить)
+            self._leases.set(key, Lease(tokens=granted - 1, expires_at=now + self.lease_ttl),
+                             ttl=self.lease_ttl + period)
+        self.metrics["allowed"] += 1
+        return True, 0
+
+    def limit(self, rate: str):
+        """Залежність FastAPI: Depends(limiter.limit("10/minute"))."""
+        default_limit = parse_rate(rate)
+
+        async def dependency(request: Request, response: Response):
+            if not self.enabled:
+                return
+            route = request.scope.get("route")
+            scope = f"{request.method} {route.path if route else request.url.path}"
+            limit, period = parse_rate(RATE_LIMITS[scope]) if scope in RATE_LIMITS else default_limit
+
+            identity = _request_user(request)
+            if identity is not None and identity in RATE_LIMIT_USERS:
+                limit, period = parse_rate(RATE_LIMIT_USERS[identity])
+            if identity is None:
+                identity = f"ip:{request.client.host if request.client else 'unknown'}"
+            else:
+                identity = f"user:{identity}"
+
+            allowed, retry_after = await self.hit(f"ratelimit:{scope}:{identity}", limit, period)
+            response.headers["X-RateLimit-Limit"] = f"{limit}/{period}s"
+            if not allowed:
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests",
+                                    headers={"Retry-After": str(retry_after),
+                                             "X-RateLimit-Limit": response.headers["X-RateLimit-Limit"]})
+
+        return dependency
+
+    def stats(self):
+        return dict(self.metrics)
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+class _InvalidToken(Exception):
+    pass
+
+def _request_user(request: Request):
+    """Email автентифікованого користувача з bearer-токена або None."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return auth.verify_token(token, _InvalidToken())
+    except _InvalidToken:
+        return None
+
+limiter = RateLimiter()
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Literal, Optional
 from datetime import date
+from config import CONTACT_BATCH_MAX_ITEMS
 
 class ContactBase(BaseModel):
     first_name: str
@@ -22,6 +23,58 @@ class ContactInDB(ContactBase):
     class Config:
         from_attributes = True
 
+class ContactImportError(BaseModel):
+    row: int
+    error: str
+
+class ContactImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ContactImportError]
+
+# Часткове оновлення одного контакту в пакеті: змінюються лише передані поля
+class ContactPatch(BaseModel):
+    id: int
+    version: Optional[int] = None  # Очікувана версія (як If-Match для одного контакту)
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone_number", "birthday")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("field may not be null")
+        return value
+
+class ContactBatchUpdate(BaseModel):
+    items: List[ContactPatch] = Field(min_length=1, max_length=CONTACT_BATCH_MAX_ITEMS)
+
+    @field_validator("items")
+    @classmethod
+    def unique_ids(cls, items):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError("each contact id may appear only once")
+        return items
+
+class ContactBatchDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=CONTACT_BATCH_MAX_ITEMS)
+
+class ContactBatchItemResult(BaseModel):
+    id: int
+    status: Literal["updated", "unchanged", "deleted", "not_found", "conflict", "email_exists"]
+    contact: Optional[ContactInDB] = None
+
+# Зміни контактів після мітки синхронізації
+class ContactChanges(BaseModel):
+    upserts: List[ContactInDB]  # Створені або змінені контакти в порядку змін
+    deleted: List[int]  # Id видалених контактів
+    next_token: str  # Мітка для наступного запиту (since)
+    has_more: bool
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
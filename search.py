@@ -0,0 +1,82 @@
+from sqlalchemy import select, func, or_, table, column, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+import re
+import models
+from crud import CONTACT_ROW_COLUMNS, CONTACT_NOT_DELETED
+
+# Слова запиту: лише літери, цифри та підкреслення (решта символів — роздільники)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+contacts_fts = table("contacts_fts", column("rowid"))
+
+def _tokens(query: str):
+    return _TOKEN_RE.findall(query.lower())
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _postgresql_statement(user_id: int, query: str, tokens):
+    Contact = models.Contact
+    vector = literal_column(models.CONTACT_SEARCH_VECTOR)
+    pattern = _like_pattern(query)
+    # Пошук за префіксами слів: "ann lee" -> "ann:* & lee:*"
+    ts_query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{token}:*" for token in tokens))
+    rank = func.ts_rank(vector, ts_query) + func.greatest(
+        func.similarity(Contact.first_name, query),
+        func.similarity(Contact.last_name, query),
+        func.similarity(Contact.email, query),
+    )
+    return (
+        select(*CONTACT_ROW_COLUMNS)
+        .where(Contact.user_id == user_id, CONTACT_NOT_DELETED)
+        .where(or_(
+            vector.op("@@")(ts_query),
+            Contact.first_name.ilike(pattern, escape="\\"),
+            Contact.last_name.ilike(pattern, escape="\\"),
+            Contact.email.ilike(pattern, escape="\\"),
+        ))
+        .order_by(rank.desc(), Contact.id)
+    )
+
+def _sqlite_statement(user_id: int, query: str, tokens):
+    Contact = models.Contact
+    fts = literal_column("contacts_fts")
+    # Синтаксис FTS5: кожне слово в лапках і з пошуком за префіксом
+    match = " ".join(f'"{token}"*' for token in tokens)
+    return (
+        select(*CONTACT_ROW_COLUMNS)
+        .join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+        .where(fts.op("MATCH")(match))
+        .where(Contact.user_id == user_id, CONTACT_NOT_DELETED)
+        .order_by(func.bm25(fts), Contact.id)
+    )
+
+def _generic_statement(user_id: int, query: str, tokens):
+    Contact = models.Contact
+    pattern = _like_pattern(query)
+    return (
+        select(*CONTACT_ROW_COLUMNS)
+        .where(Contact.user_id == user_id, CONTACT_NOT_DELETED)
+        .where(or_(
+            Contact.first_name.ilike(pattern, escape="\\"),
+            Contact.last_name.ilike(pattern, escape="\\"),
+            Contact.email.ilike(pattern, escape="\\"),
+        ))
+        .order_by(Contact.id)
+    )
+
+_STATEMENTS = {
+    "postgresql": _postgresql_statement,
+    "sqlite": _sqlite_statement,
+}
+
+async def search_contacts(db: AsyncSession, user_id: int, query: str, skip: int = 0, limit: int = 10):
+    """Ранжований пошук контактів користувача з пагінацією (рядки з колонками CONTACT_ROW_COLUMNS)."""
+    query = query.strip()
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    build = _STATEMENTS.get(db.bind.dialect.name, _generic_statement)
+    result = await db.execute(build(user_id, query, tokens).offset(skip).limit(limit))
+    return result.all()
@@ -0,0 +1,64 @@
+"""Спільні налаштування тестів: тимчасова база SQLite, мігрована до head, і застосунок поверх неї."""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Оточення застосунку має бути готове до імпорту main
+TEST_DIR = tempfile.mkdtemp(prefix="contacts_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'app.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["MAIL_SUPPRESS_SEND"] = "true"
+os.environ["AVATAR_STORAGE"] = "local"
+os.environ["AVATAR_LOCAL_DIR"] = os.path.join(TEST_DIR, "avatars")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["ACCESS_TOKEN_EXPIRE_MINUTES"] = "60"
+os.environ["EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS"] = "1"
+os.environ["EMAIL_VERIFICATION_TOKEN_EXPIRE_MINUTES"] = "60"
+os.environ["SENDER_EMAIL"] = "tests@example.com"
+
+def migrate(url: str, revision: str = "head"):
+    from alembic import command
+    from alembic.config import Config
+
+    # alembic/env.py бере адресу бази з DATABASE_URL
+    previous = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = url
+    try:
+        alembic_cfg = Config(os.path.join(ROOT, "alembic.ini"))
+        alembic_cfg.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+        command.upgrade(alembic_cfg, revision)
+    finally:
+        os.environ["DATABASE_URL"] = previous
+
+@contextmanager
+def count_statements(engine):
+    """Збирає SQL-інструкції, які рушій надсилає до бази в межах блоку."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    migrate(os.environ["DATABASE_URL"])
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,61 @@
+import asyncio
+import io
+import os
+import sqlite3
+
+import auth
+from avatars import AvatarPipeline, AvatarResult, LocalStorage
+from conftest import TEST_DIR
+from token_utils import create_email_verification_token
+
+def png_bytes(color=(200, 120, 40)) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 200), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def register(client, email):
+    assert client.post("/register", json={"email": email, "password": "avatar-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+def upload(client, headers, data):
+    return client.post("/users/me/avatar", files={"file": ("avatar.png", data, "image/png")}, headers=headers)
+
+def test_result_url_uses_largest_rendered_size():
+    assert AvatarResult(content_hash="x", urls={32: "/32.webp", 96: "/96.webp"}).url == "/96.webp"
+    assert AvatarResult(content_hash="x").url is None
+
+def test_pipeline_with_custom_sizes(tmp_path):
+    from starlette.datastructures import UploadFile
+
+    pipeline = AvatarPipeline(storage=LocalStorage(str(tmp_path), "/media/"), sizes=(48, 24), max_workers=1)
+    try:
+        result = asyncio.run(pipeline.save(1, UploadFile(io.BytesIO(png_bytes()))))
+    finally:
+        pipeline.shutdown()
+    assert sorted(result.urls) == [24, 48]
+    assert result.url == result.urls[48]
+
+def test_upload_then_same_file_is_unchanged(client):
+    headers = register(client, "avatar@example.com")
+    data = png_bytes()
+
+    first = upload(client, headers, data)
+    assert first.status_code == 200
+    assert first.json()["avatar_url"].endswith("_256.webp")
+
+    second = upload(client, headers, data)
+    assert second.json() == {"msg": "Avatar is unchanged", "avatar_url": first.json()["avatar_url"]}
+
+def test_upload_for_deleted_user_is_404(client):
+    headers = register(client, "avatar-gone@example.com")
+    # Користувач лишається в кеші автентифікації, але його рядок уже видалено
+    assert client.get("/contacts/", headers=headers).status_code == 200
+    connection = sqlite3.connect(os.path.join(TEST_DIR, "app.db"))
+    connection.execute("DELETE FROM users WHERE email = 'avatar-gone@example.com'")
+    connection.commit()
+    connection.close()
+
+    assert upload(client, headers, png_bytes()).status_code == 404
@@ -0,0 +1,82 @@
+import pytest
+
+import auth
+from token_utils import create_email_verification_token
+
+CONTACT = {
+    "first_name": "Taras",
+    "last_name": "Bondarenko",
+    "phone_number": "0501234567",
+    "birthday": "1985-03-09",
+}
+
+@pytest.fixture(scope="module")
+def headers(client):
+    email = "batch@example.com"
+    assert client.post("/register", json={"email": email, "password": "batch-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+def create_contact(client, headers, email):
+    response = client.post("/contacts/", json={**CONTACT, "email": email}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def version(client, headers, contact_id):
+    return int(client.get(f"/contacts/{contact_id}", headers=headers).headers["ETag"].strip('"').split(".")[1])
+
+def patch(client, headers, items):
+    response = client.patch("/contacts/batch", json={"items": items}, headers=headers)
+    assert response.status_code == 200
+    return {item["id"]: item for item in response.json()}
+
+def test_duplicate_email_is_reported_per_item(client, headers):
+    first = create_contact(client, headers, "batch-first@example.com")
+    second = create_contact(client, headers, "batch-second@example.com")
+    third = create_contact(client, headers, "batch-third@example.com")
+
+    results = patch(client, headers, [
+        {"id": first, "email": "batch-second@example.com"},
+        {"id": second, "additional_info": "kept"},
+        {"id": third, "email": "batch-new@example.com"},
+    ])
+
+    assert results[first]["status"] == "email_exists"
+    assert results[second]["status"] == "updated"
+    assert results[second]["contact"]["additional_info"] == "kept"
+    assert results[third]["contact"]["email"] == "batch-new@example.com"
+
+def test_same_new_email_twice_in_one_batch(client, headers):
+    first = create_contact(client, headers, "twice-first@example.com")
+    second = create_contact(client, headers, "twice-second@example.com")
+
+    results = patch(client, headers, [
+        {"id": first, "email": "twice-new@example.com"},
+        {"id": second, "email": "twice-new@example.com"},
+    ])
+
+    assert [results[first]["status"], results[second]["status"]] == ["updated", "email_exists"]
+
+def test_item_without_fields_keeps_version(client, headers):
+    contact_id = create_contact(client, headers, "noop@example.com")
+    before = version(client, headers, contact_id)
+
+    results = patch(client, headers, [{"id": contact_id, "version": before}])
+
+    assert results[contact_id]["status"] == "unchanged"
+    assert results[contact_id]["contact"]["email"] == "noop@example.com"
+    assert version(client, headers, contact_id) == before
+
+def test_stale_version_and_missing_contact(client, headers):
+    contact_id = create_contact(client, headers, "stale@example.com")
+    before = version(client, headers, contact_id)
+    patch(client, headers, [{"id": contact_id, "additional_info": "first"}])
+
+    results = patch(client, headers, [
+        {"id": contact_id, "version": before, "additional_info": "second"},
+        {"id": 10 ** 9, "additional_info": "missing"},
+    ])
+
+    assert results[contact_id]["status"] == "conflict"
+    assert results[10 ** 9]["status"] == "not_found"
+    assert version(client, headers, contact_id) == before + 1
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import birthday_digest
+import config
+import models
+from conftest import TEST_DIR, migrate
+
+TODAY = date(2024, 5, 1)
+
+class RecordingQueue:
+    """Замість черги mailer: запам'ятовує адресатів і може «впасти» на заданому."""
+
+    def __init__(self):
+        self.recipients = []
+        self.fail_on = None
+
+    async def put(self, message):
+        if message['To'] == self.fail_on:
+            raise RuntimeError("worker crashed")
+        self.recipients.append(message['To'])
+
+    async def flush(self):
+        pass
+
+@pytest.fixture
+def digest_db(monkeypatch):
+    """Окрема база: користувачі 1–5 мають контакт із днем народження за два дні, 6 — ні, 7 не підтверджений."""
+    path = os.path.join(TEST_DIR, "digest.db")
+    if os.path.exists(path):
+        os.remove(path)
+    url = f"sqlite:///{path}"
+    migrate(url)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO users (id, email, hashed_password, is_active, is_verified) VALUES (?, ?, 'x', 1, ?)",
+        [(user_id, f"user{user_id}@example.com", user_id != 7) for user_id in range(1, 8)],
+    )
+    birthdays = {user_id: date(1990, 5, 3) for user_id in (1, 2, 3, 4, 5, 7)}
+    birthdays[6] = date(1990, 9, 1)
+    connection.executemany(
+        "INSERT INTO contacts (first_name, last_name, email, phone_number, birthday, birthday_md, user_id) "
+        "VALUES ('Olena', 'Melnyk', ?, '0671234567', ?, ?, ?)",
+        [(f"friend{user_id}@example.com", birthday.isoformat(), models.birthday_key(birthday), user_id)
+         for user_id, birthday in birthdays.items()],
+    )
+    connection.commit()
+    connection.close()
+
+    engine = create_async_engine(config.get_async_url(url), poolclass=NullPool)
+    monkeypatch.setattr(config, "SessionLocal", async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False))
+    queue = RecordingQueue()
+    monkeypatch.setattr(birthday_digest, "mail_queue", queue)
+    yield queue
+    asyncio.run(engine.dispose())
+
+def checkpoints():
+    async def load():
+        async with config.SessionLocal() as db:
+            result = await db.scalars(select(models.JobCheckpoint).order_by(models.JobCheckpoint.run_date))
+            return [(row.run_date, row.last_user_id, row.processed, row.completed_at is not None) for row in result]
+
+    return asyncio.run(load())
+
+def run(today=TODAY):
+    return asyncio.run(birthday_digest.run_digest(today, days=7, batch_size=2))
+
+def test_digest_sends_one_email_per_user_with_birthdays(digest_db):
+    stats = run()
+
+    assert digest_db.recipients == [f"user{user_id}@example.com" for user_id in range(1, 6)]
+    assert stats["digests"] == 5
+    assert stats["users"] == 6
+    assert stats["batches"] == 3
+    assert checkpoints() == [(TODAY, 6, 5, True)]
+
+def test_digest_resumes_after_crash_and_runs_once_per_day(digest_db):
+    digest_db.fail_on = "user4@example.com"
+    with pytest.raises(RuntimeError):
+        run()
+    # Збережено лише першу пачку; лист user3 з незбереженої пачки вже пішов
+    assert digest_db.recipients == ["user1@example.com", "user2@example.com", "user3@example.com"]
+    assert checkpoints() == [(TODAY, 2, 2, False)]
+
+    digest_db.fail_on = None
+    digest_db.recipients.clear()
+    stats = run()
+    assert stats["resumed_from"] == 2
+    assert digest_db.recipients == ["user3@example.com", "user4@example.com", "user5@example.com"]
+    assert checkpoints() == [(TODAY, 6, 5, True)]
+
+    # Повторний запуск за той самий день нічого не надсилає
+    digest_db.recipients.clear()
+    assert run()["skipped"] is True
+    assert digest_db.recipients == []
+
+    # Наступний день має власну контрольну точку і починає спочатку
+    assert run(date(2024, 5, 2))["resumed_from"] == 0
+    assert len(digest_db.recipients) == 5
@@ -0,0 +1,45 @@
+import pytest
+
+import auth
+from token_utils import create_email_verification_token
+
+HEADER = "first_name,last_name,email,phone_number,birthday\n"
+
+@pytest.fixture(scope="module")
+def headers(client):
+    email = "importer@example.com"
+    assert client.post("/register", json={"email": email, "password": "import-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+def import_csv(client, headers, data: bytes):
+    return client.post("/contacts/import", files={"file": ("contacts.csv", data, "text/csv")}, headers=headers)
+
+def exported_emails(client, headers):
+    response = client.get("/contacts/export", params={"format": "csv"}, headers=headers)
+    return {line.split(",")[2] for line in response.text.splitlines()[1:]}
+
+def test_non_utf8_file_is_rejected_before_import(client, headers):
+    data = (HEADER + "Olena,Melnyk,latin1-ok@example.com,0671234567,1990-05-17\n"
+            "Zoë,Müller,latin1-bad@example.com,0671234568,1991-06-18\n").encode("latin-1")
+
+    response = import_csv(client, headers, data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File must be UTF-8 encoded CSV or NDJSON"
+    assert "latin1-ok@example.com" not in exported_emails(client, headers)
+
+def test_unparseable_csv_row_is_reported_in_row_order(client, headers):
+    data = (HEADER
+            + "Olena,Melnyk,first-row@example.com,0671234567,1990-05-17\n"
+            + "Taras,Bondarenko,not-an-email,0671234568,1991-06-18\n"
+            + 'Iryna,"' + "x" * 200_000 + '",huge@example.com,0671234569,1992-07-19\n'
+            + "Oksana,Boyko,last-row@example.com,0671234570,1993-08-20\n").encode()
+
+    result = import_csv(client, headers, data).json()
+
+    assert result["imported"] == 2
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+    assert result["errors"][1]["error"] == "Malformed record"
+    assert {"first-row@example.com", "last-row@example.com"} <= exported_emails(client, headers)
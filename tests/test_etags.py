@@ -0,0 +1,45 @@
+import pytest
+
+import auth
+from ratelimit import MemoryBackend, limiter
+from token_utils import create_email_verification_token
+
+CONTACT = {
+    "first_name": "Iryna",
+    "last_name": "Kovalenko",
+    "email": "iryna@example.com",
+    "phone_number": "0931234567",
+    "birthday": "1992-11-02",
+}
+
+@pytest.fixture(scope="module")
+def headers(client):
+    email = "etags@example.com"
+    assert client.post("/register", json={"email": email, "password": "etags-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+def test_if_match_any_on_missing_contact_is_412(client, headers):
+    any_version = {**headers, "If-Match": "*"}
+    assert client.put(f"/contacts/{10 ** 9}", json=CONTACT, headers=any_version).status_code == 412
+    assert client.delete(f"/contacts/{10 ** 9}", headers=any_version).status_code == 412
+    # Без If-Match відсутній контакт — як і раніше 404
+    assert client.delete(f"/contacts/{10 ** 9}", headers=headers).status_code == 404
+
+def test_if_match_any_on_existing_contact(client, headers):
+    contact_id = client.post("/contacts/", json=CONTACT, headers=headers).json()["id"]
+    any_version = {**headers, "If-Match": "*"}
+    assert client.put(f"/contacts/{contact_id}", json=CONTACT, headers=any_version).status_code == 200
+    assert client.delete(f"/contacts/{contact_id}", headers=any_version).status_code == 200
+
+def test_not_modified_keeps_rate_limit_headers(client, headers, monkeypatch):
+    contact_id = client.post("/contacts/", json={**CONTACT, "email": "cached@example.com"}, headers=headers).json()["id"]
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(limiter, "backend", MemoryBackend())
+
+    for path in (f"/contacts/{contact_id}", "/contacts/"):
+        etag = client.get(path, headers=headers).headers["ETag"]
+        response = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.headers["X-RateLimit-Limit"] == "10/60s"
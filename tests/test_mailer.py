@@ -0,0 +1,122 @@
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import mailer
+from mailer import MailQueue, SMTPPool, build_message
+
+class Handler:
+    """Локальний SMTP-сервер: приймає листи, може відхилити адресата або тимчасово відмовити."""
+
+    def __init__(self):
+        self.delivered = []
+        self.refused = set()
+        self.temporary_failures = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.temporary_failures:
+            self.temporary_failures -= 1
+            return "451 Try again later"
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(mailer, "SMTP_SERVER", controller.hostname)
+    monkeypatch.setattr(mailer, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(mailer, "SMTP_START_TLS", False)
+    monkeypatch.setattr(mailer, "SENDER_PASSWORD", None)
+    yield handler
+    controller.stop()
+
+def send(messages, pool_size=1, **options):
+    queue = MailQueue(SMTPPool(pool_size), backoff=0.01, suppress_send=False, **options)
+
+    async def run():
+        await queue.start()
+        for message in messages:
+            queue.enqueue(message)
+        await asyncio.wait_for(queue.flush(), 10)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    return asyncio.run(run())
+
+def messages(count):
+    return [build_message(f"user{index}@example.com", "Hello", "<p>Hi</p>") for index in range(count)]
+
+def test_batch_is_sent_over_one_connection(smtp_server):
+    stats = send(messages(5), batch_size=10)
+
+    assert sorted(smtp_server.delivered) == [f"user{index}@example.com" for index in range(5)]
+    assert stats["sent"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["failed"] == stats["retried"] == 0
+
+def test_temporary_failure_is_retried(smtp_server):
+    smtp_server.temporary_failures = 2
+
+    stats = send(messages(1), max_retries=3)
+
+    assert smtp_server.delivered == ["user0@example.com"]
+    assert stats["sent"] == 1
+    assert stats["retried"] == 2
+    assert stats["failed"] == 0
+
+def test_gives_up_after_max_retries(smtp_server):
+    smtp_server.temporary_failures = 10
+
+    stats = send(messages(1), max_retries=2)
+
+    assert smtp_server.delivered == []
+    assert stats["retried"] == 2
+    assert stats["failed"] == 1
+
+def test_refused_recipient_is_not_retried(smtp_server):
+    smtp_server.refused.add("user1@example.com")
+
+    stats = send(messages(3))
+
+    assert sorted(smtp_server.delivered) == ["user0@example.com", "user2@example.com"]
+    assert stats["sent"] == 2
+    assert stats["failed"] == 1
+    assert stats["retried"] == 0
+
+def test_unexpected_error_does_not_stop_worker(smtp_server, monkeypatch):
+    original = mailer.aiosmtplib.SMTP.send_message
+    calls = 0
+
+    async def send_message(self, message, *args, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ValueError("boom")
+        return await original(self, message, *args, **kwargs)
+
+    monkeypatch.setattr(mailer.aiosmtplib.SMTP, "send_message", send_message)
+
+    # batch_size=1: кожен лист окремою пачкою, тож збій першого не зачіпає решту
+    stats = send(messages(3), batch_size=1)
+
+    assert sorted(smtp_server.delivered) == ["user1@example.com", "user2@example.com"]
+    assert stats["sent"] == 2
+    assert stats["failed"] == 1
+    # З'єднання після непередбаченої помилки не повертається в пул
+    assert stats["connections_opened"] == 2
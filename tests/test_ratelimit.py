@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from ratelimit import MemoryBackend, RateLimiter, RedisBackend
+
+def redis_backend():
+    import fakeredis
+
+    return RedisBackend(fakeredis.FakeAsyncRedis())
+
+BACKENDS = {"memory": MemoryBackend, "redis": redis_backend}
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return BACKENDS[request.param]()
+
+def test_limit_is_enforced(backend):
+    async def run():
+        # Біля межі ліміту бекенд видає по одному токену
+        grants = [await backend.acquire("key", 5, 60, 1) for _ in range(5)]
+        denied, retry_after_ms = await backend.acquire("key", 5, 60, 1)
+        other = await backend.acquire("other", 5, 60, 1)
+        return grants, denied, retry_after_ms, other
+
+    grants, denied, retry_after_ms, other = asyncio.run(run())
+    assert grants == [(1, 0)] * 5
+    assert denied == 0
+    assert 11_000 < retry_after_ms <= 12_000
+    assert other == (1, 0)
+
+def test_lease_is_granted_only_far_from_limit(backend):
+    async def run():
+        return [(await backend.acquire("key", 10, 60, 3))[0] for _ in range(7)]
+
+    # 3 з 10, далі ще 3 (залишилося 7 >= 6), потім лише по одному токену
+    assert asyncio.run(run()) == [3, 3, 1, 1, 1, 1, 0]
+
+def test_refund_returns_unused_tokens(backend):
+    async def run():
+        granted = [(await backend.acquire("key", 4, 60, 1))[0] for _ in range(4)]
+        assert granted == [1, 1, 1, 1]
+        assert (await backend.acquire("key", 4, 60, 1))[0] == 0
+        # Повернення двох токенів дає змогу одразу видати їх знову
+        return [(await backend.acquire("key", 4, 60, 1, refund=2 if index == 0 else 0))[0] for index in range(3)]
+
+    assert asyncio.run(run()) == [1, 1, 0]
+
+def test_limiter_spends_lease_locally_and_refunds_leftover(backend):
+    limiter = RateLimiter(backend=backend, lease_fraction=0.5, lease_ttl=0.05)
+
+    async def run():
+        allowed = [(await limiter.hit("key", 10, 60))[0] for _ in range(2)]
+        await asyncio.sleep(0.1)
+        # Оренда прострочилася з трьома невикористаними токенами — вони повертаються бекенду
+        while (await limiter.hit("key", 10, 60))[0]:
+            allowed.append(True)
+        return allowed
+
+    allowed = asyncio.run(run())
+    assert limiter.metrics["local_hits"] == 1
+    assert limiter.metrics["refunded"] == 3
+    # Без повернення залишку клієнт отримав би лише 7 запитів із 10
+    assert len(allowed) == 10
+
+def test_backend_error_allows_request():
+    class Broken:
+        async def acquire(self, *args):
+            raise ConnectionError("redis is down")
+
+    limiter = RateLimiter(backend=Broken())
+    assert asyncio.run(limiter.hit("key", 1, 60)) == (True, 0)
+    assert limiter.metrics["backend_errors"] == 1
+
+def test_dependency_sets_limit_and_retry_after_headers(backend):
+    limiter = RateLimiter(backend=backend, enabled=True)
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(limiter.limit("2/minute"))])
+    async def limited():
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        responses = [client.get("/limited") for _ in range(3)]
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert all(response.headers["X-RateLimit-Limit"] == "2/60s" for response in responses)
+    assert 29 <= int(responses[2].headers["Retry-After"]) <= 30
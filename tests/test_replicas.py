@@ -0,0 +1,78 @@
+import os
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+import auth
+import config
+from conftest import TEST_DIR, migrate
+from token_utils import create_email_verification_token
+
+CONTACT = {
+    "first_name": "Dmytro",
+    "last_name": "Lysenko",
+    "email": "replica-contact@example.com",
+    "phone_number": "0661234567",
+    "birthday": "1988-02-14",
+}
+
+@pytest.fixture
+def replica(client, monkeypatch):
+    """Друга база SQLite як репліка, що відстає: у ній лише схема, без даних основної бази."""
+    url = f"sqlite:///{os.path.join(TEST_DIR, 'replica.db')}"
+    migrate(url)
+    engine = create_async_engine(config.get_async_url(url), poolclass=NullPool)
+    router = config.ReplicaRouter()
+    router.add(engine)
+    monkeypatch.setattr(config, "replicas", router)
+    config.recent_writers.clear()
+    yield router
+    config.recent_writers.clear()
+
+def register(client, email):
+    assert client.post("/register", json={"email": email, "password": "replica-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+
+def bearer(email, minutes=60):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email}, timedelta(minutes=minutes))}"}
+
+def test_round_robin_skips_unhealthy_replicas():
+    router = config.ReplicaRouter()
+    first, second = object(), object()
+    router.add(first)
+    router.add(second)
+    assert [router.choose(), router.choose(), router.choose()] == [first, second, first]
+    router.healthy[0] = False
+    assert [router.choose(), router.choose()] == [second, second]
+    router.healthy[1] = False
+    assert router.choose() is None
+
+def test_reads_go_to_replica_until_user_writes(client, replica):
+    writer, other = "replica-writer@example.com", "replica-other@example.com"
+    register(client, writer)
+    register(client, other)
+    config.recent_writers.clear()
+
+    # Без недавніх записів читання йде на репліку, де контактів ще немає
+    assert client.get("/contacts/", headers=bearer(writer)).json() == []
+    assert client.post("/contacts/", json=CONTACT, headers=bearer(writer)).status_code == 200
+
+    # Прив'язка до основної бази — за користувачем: інший токен того ж користувача бачить запис
+    second_device = bearer(writer, minutes=90)
+    assert [contact["email"] for contact in client.get("/contacts/", headers=second_device).json()] == [CONTACT["email"]]
+    # Інший користувач і далі читає з репліки
+    assert "user:" + other not in config.recent_writers
+    assert client.get("/contacts/", headers=bearer(other)).json() == []
+
+def test_unhealthy_replica_falls_back_to_primary(client, replica):
+    email = "replica-fallback@example.com"
+    register(client, email)
+    assert client.post("/contacts/", json={**CONTACT, "email": "fallback-contact@example.com"},
+                       headers=bearer(email)).status_code == 200
+    config.recent_writers.clear()
+    assert client.get("/contacts/", headers=bearer(email)).json() == []
+
+    replica.mark_unhealthy(replica.engines[0])
+    assert len(client.get("/contacts/", headers=bearer(email)).json()) == 1
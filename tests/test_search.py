@@ -0,0 +1,69 @@
+import pytest
+
+import auth
+from token_utils import create_email_verification_token
+
+def register(client, email):
+    assert client.post("/register", json={"email": email, "password": "search-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+def contact(first_name, last_name, email):
+    return {"first_name": first_name, "last_name": last_name, "email": email,
+            "phone_number": "0671234567", "birthday": "1990-05-17"}
+
+@pytest.fixture(scope="module")
+def owner(client):
+    headers = register(client, "searcher@example.com")
+    ids = {}
+    for first_name, last_name, email in [
+        ("Annabel", "Leeson", "annabel.search@example.com"),
+        ("Anna", "Kravchenko", "anna.k.search@example.com"),
+        ("Bohdan", "Tkachenko", "bohdan.search@example.com"),
+    ]:
+        ids[first_name] = client.post("/contacts/", json=contact(first_name, last_name, email), headers=headers).json()["id"]
+    return headers, ids
+
+def search(client, headers, query, **params):
+    response = client.get("/contacts/search/", params={"query": query, **params}, headers=headers)
+    assert response.status_code == 200
+    return [item["first_name"] for item in response.json()]
+
+def test_prefix_and_multi_word_queries(client, owner):
+    headers, _ = owner
+    assert sorted(search(client, headers, "ann")) == ["Anna", "Annabel"]
+    assert search(client, headers, "ann lee") == ["Annabel"]
+    assert search(client, headers, "TKACH") == ["Bohdan"]
+    # Email розбивається на слова так само, як і імена
+    assert search(client, headers, "bohdan.search") == ["Bohdan"]
+
+def test_pagination(client, owner):
+    headers, _ = owner
+    first = search(client, headers, "ann", limit=1)
+    second = search(client, headers, "ann", limit=1, skip=1)
+    assert len(first) == len(second) == 1
+    assert sorted(first + second) == ["Anna", "Annabel"]
+
+def test_results_are_scoped_to_owner(client, owner):
+    headers, _ = owner
+    stranger = register(client, "search-stranger@example.com")
+    assert search(client, stranger, "ann") == []
+    client.post("/contacts/", json=contact("Annika", "Stranger", "annika.search@example.com"), headers=stranger)
+    assert search(client, stranger, "ann") == ["Annika"]
+    assert "Annika" not in search(client, headers, "ann")
+
+def test_index_follows_updates_and_deletes(client, owner):
+    headers, ids = owner
+    updated = contact("Bohdana", "Shevchenko", "bohdan.search@example.com")
+    assert client.put(f"/contacts/{ids['Bohdan']}", json=updated, headers=headers).status_code == 200
+    assert search(client, headers, "tkachenko") == []
+    assert search(client, headers, "shevch") == ["Bohdana"]
+
+    assert client.delete(f"/contacts/{ids['Bohdan']}", headers=headers).status_code == 200
+    assert search(client, headers, "shevch") == []
+
+def test_punctuation_only_and_fts_syntax_are_safe(client, owner):
+    headers, _ = owner
+    assert search(client, headers, "  -- ") == []
+    assert search(client, headers, '"anna" OR NEAR(') == []
+    assert sorted(search(client, headers, 'anna"')) == ["Anna", "Annabel"]
@@ -0,0 +1,39 @@
+import asyncio
+import os
+import sqlite3
+
+import config
+import crud
+from conftest import TEST_DIR, migrate
+
+def test_changes_page_through_backfilled_contacts(monkeypatch):
+    """Контакти, яким мітки змін заповнила міграція, віддаються синхронізацією всі, по одному на сторінку."""
+    path = os.path.join(TEST_DIR, "backfill.db")
+    url = f"sqlite:///{path}"
+    # Ревізія перед додаванням міток часу: контакти вже існують, коли міграція їх заповнює
+    migrate(url, "0d3f8a5b7c12")
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO users (id, email, hashed_password, is_active, is_verified) VALUES (1, 'owner@example.com', 'x', 1, 1)")
+    connection.executemany(
+        "INSERT INTO contacts (id, first_name, last_name, email, phone_number, birthday, user_id) VALUES (?, ?, ?, ?, ?, ?, 1)",
+        [(contact_id, "Olena", "Melnyk", f"contact{contact_id}@example.com", "0671234567", "1990-05-17")
+         for contact_id in range(1, 5)],
+    )
+    connection.commit()
+    connection.close()
+    migrate(url)
+    monkeypatch.setattr(crud, "SYNC_SAFETY_LAG_SECONDS", 0)
+
+    async def sync_all():
+        engine = config.create_engine(url)
+        seen, since, has_more = [], None, True
+        try:
+            async with config.AsyncSession(engine) as db:
+                while has_more:
+                    rows, since, has_more = await crud.get_contact_changes(db, 1, since=since, limit=1)
+                    seen.extend(row.id for row in rows)
+        finally:
+            await engine.dispose()
+        return seen
+
+    assert asyncio.run(sync_all()) == [1, 2, 3, 4]
@@ -0,0 +1,90 @@
+"""Кожен запис контакту чи користувача — одна інструкція INSERT/UPDATE ... RETURNING."""
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import auth
+import config
+import crud
+from conftest import count_statements
+from token_utils import create_email_verification_token
+
+CONTACT = {
+    "first_name": "Olena",
+    "last_name": "Melnyk",
+    "email": "olena@example.com",
+    "phone_number": "0671234567",
+    "birthday": "1990-05-17",
+}
+
+@pytest.fixture(scope="module")
+def headers(client):
+    email = "writer@example.com"
+    assert client.post("/register", json={"email": email, "password": "writer-password"}).status_code == 200
+    assert client.get("/verify-email", params={"token": create_email_verification_token(email)}).status_code == 200
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+    # Користувач потрапляє в кеш, тож далі запити рахують лише власні інструкції маршруту
+    assert client.get("/contacts/", headers=headers).status_code == 200
+    return headers
+
+def create_contact(client, headers, email):
+    response = client.post("/contacts/", json={**CONTACT, "email": email}, headers=headers)
+    assert response.status_code == 200
+    return response
+
+def test_register_is_one_statement(client):
+    with count_statements(config.engine) as statements:
+        response = client.post("/register", json={"email": "single@example.com", "password": "single-password"})
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+def test_create_is_one_statement(client, headers):
+    with count_statements(config.engine) as statements:
+        create_contact(client, headers, "create@example.com")
+    assert len(statements) == 1, statements
+
+def test_update_is_one_statement(client, headers):
+    contact_id = create_contact(client, headers, "update@example.com").json()["id"]
+    with count_statements(config.engine) as statements:
+        response = client.put(f"/contacts/{contact_id}", json={**CONTACT, "email": "updated@example.com"}, headers=headers)
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+def test_delete_is_one_statement(client, headers):
+    contact_id = create_contact(client, headers, "delete@example.com").json()["id"]
+    with count_statements(config.engine) as statements:
+        response = client.delete(f"/contacts/{contact_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+def test_if_match_separates_stale_version_from_missing_contact(client, headers):
+    contact_id = create_contact(client, headers, "if-match@example.com").json()["id"]
+    etag = client.get(f"/contacts/{contact_id}", headers=headers).headers["ETag"]
+    payload = {**CONTACT, "email": "if-match@example.com"}
+
+    assert client.put(f"/contacts/{contact_id}", json=payload, headers=headers).status_code == 200
+    # Тег попередньої версії: контакт існує, але змінився
+    stale = client.put(f"/contacts/{contact_id}", json=payload, headers={**headers, "If-Match": etag})
+    assert stale.status_code == 412
+    assert client.delete(f"/contacts/{contact_id}", headers={**headers, "If-Match": etag}).status_code == 412
+
+    assert client.delete(f"/contacts/{contact_id}", headers=headers).status_code == 200
+    # Видалений контакт — 404 навіть із тегом, що колись був чинним
+    missing = f'"{contact_id}.1"'
+    assert client.put(f"/contacts/{contact_id}", json=payload, headers={**headers, "If-Match": missing}).status_code == 404
+    assert client.delete(f"/contacts/{contact_id}", headers={**headers, "If-Match": missing}).status_code == 404
+
+def test_only_email_conflicts_map_to_contact_email_exists():
+    def integrity_error(message):
+        return IntegrityError("INSERT INTO contacts ...", {}, sqlite3.IntegrityError(message))
+
+    assert crud._is_contact_email_conflict(integrity_error("UNIQUE constraint failed: contacts.email"))
+    assert not crud._is_contact_email_conflict(integrity_error("NOT NULL constraint failed: contacts.user_id"))
+    assert not crud._is_contact_email_conflict(integrity_error("FOREIGN KEY constraint failed"))
+
+def test_duplicate_email_is_400(client, headers):
+    create_contact(client, headers, "duplicate@example.com")
+    response = client.post("/contacts/", json={**CONTACT, "email": "duplicate@example.com"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Contact with this email already exists"